@@ -0,0 +1,119 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Benchmark of the wire formats of the scope kamas values, on the local
+stand-in backend filled with a value every 30 minutes.
+
+For each scope, print the bytes sent and the decode time of the
+kamas values as a list of dicts or by column, with and without compression.
+Run: python -m benchmarks.backend_benchmark
+"""
+
+import datetime
+import random
+import time
+
+import requests
+
+from src.utils.backend import COLUMNS_MEDIA_TYPE, decode_kamas_columns, kamas_body
+from tests.backend_stub import StubBackend
+
+SERVER = "Draconiros"
+SITES = ["D2gate", "Kamas facile", "Fun shop", "Mode marchand", "Try and judge"]
+SCOPES_DAYS = {"day": 1, "week": 7, "month": 31, "six_months": 183, "year": 365}
+ENCODINGS = {
+    "rows": {"Accept-Encoding": "identity"},
+    "rows + compression": {"Accept-Encoding": "gzip"},
+    "columns": {"Accept-Encoding": "identity", "Accept": COLUMNS_MEDIA_TYPE},
+    "columns + compression": {
+        "Accept-Encoding": "gzip",
+        "Accept": COLUMNS_MEDIA_TYPE,
+    },
+}
+RUNS = 5
+
+
+def kamas_values(days: int) -> list:
+    """
+    Create a kamas value every 30 minutes
+
+    Args:
+        days (int): the number of days
+
+    Returns:
+        list: the kamas values
+    """
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    values = []
+    for i in range(days * 48):
+        prices = {site: round(random.uniform(3, 6), 2) for site in SITES}
+        average = sum(prices.values()) / len(prices)
+        values.append(
+            kamas_body(
+                prices, average, max(prices.values()), min(prices.values()), SERVER
+            )
+            | {"timestamp": (start + datetime.timedelta(minutes=30 * i)).isoformat()}
+        )
+    return values
+
+
+def measure(stub: StubBackend, url: str, headers: dict) -> tuple:
+    """
+    Measure the bytes sent and the mean decode time of the kamas values
+
+    Args:
+        stub (StubBackend): the stand-in backend
+        url (str): the scope url
+        headers (dict): the negotiation headers
+
+    Returns:
+        tuple: the bytes sent and the mean decode time in ms
+    """
+    duration = 0.0
+    for _ in range(RUNS):
+        response = requests.get(url, headers=headers, stream=True, timeout=30)
+        start = time.perf_counter()
+        # The body is decompressed while it is read
+        response.content  # pylint: disable=pointless-statement
+        decode_kamas_columns(response, SERVER)
+        duration += time.perf_counter() - start
+    return stub.answers[-1][3], duration / RUNS * 1000
+
+
+def main() -> None:
+    """
+    Print the bytes sent and the decode time of each encoding for each scope
+    """
+    print(f"{'scope':<12}{'encoding':<24}{'bytes':>12}{'decode (ms)':>13}")
+    for scope, days in SCOPES_DAYS.items():
+        with StubBackend() as stub:
+            stub.values = kamas_values(days)
+            url = f"http://127.0.0.1:{stub.port}/kamas?server={SERVER}&scope={scope}"
+            for encoding, headers in ENCODINGS.items():
+                size, duration = measure(stub, url, headers)
+                print(f"{scope:<12}{encoding:<24}{size:>12}{duration:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Benchmark of the timestamps parsing of the line graph, on a value every
+15 minutes for a year, whose timestamps have 1 to 6 fraction digits.
+
+Run: python -m benchmarks.line_graph_benchmark
+"""
+
+import datetime
+import random
+import time
+from typing import Callable
+
+import pandas as pd
+
+from src.utils.graphs import LineGraph
+from src.utils.tools import parse_timestamps
+
+POINTS = 35_040
+RUNS = 5
+
+
+def timestamps() -> list:
+    """
+    Create the timestamps of the values, with a variable number of fraction digits
+
+    Returns:
+        list: the ISO 8601 timestamps
+    """
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    values = []
+    for i in range(POINTS):
+        date = start + datetime.timedelta(
+            minutes=15 * i, microseconds=random.randrange(1, 1_000_000)
+        )
+        date_time, offset = date.isoformat()[:26], date.isoformat()[26:]
+        values.append(date_time[: random.randint(21, 26)] + offset)
+    return values
+
+
+def strptime_loop(values: list) -> list:
+    """
+    Parse the timestamps one by one, as the line graph did
+
+    Args:
+        values (list): the timestamps
+
+    Returns:
+        list: the dates
+    """
+    return [
+        datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%f%z") for date in values
+    ]
+
+
+def pandas_to_datetime(values: list) -> pd.DatetimeIndex:
+    """
+    Parse the timestamps with pandas
+
+    Args:
+        values (list): the timestamps
+
+    Returns:
+        pd.DatetimeIndex: the dates
+    """
+    return pd.to_datetime(values, format="ISO8601", utc=True)
+
+
+def measure(function: Callable, *args) -> float:
+    """
+    Measure the mean duration of a function
+
+    Args:
+        function (Callable): the function
+        *args: its arguments
+
+    Returns:
+        float: the mean duration in ms
+    """
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        function(*args)
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def main() -> None:
+    """
+    Print the duration of the timestamps parsing and of the line graph creation.
+    The line graph parses the timestamps, or takes the parsed dates
+    """
+    values = timestamps()
+    y_values = [random.uniform(3, 6) for _ in range(POINTS)]
+
+    def line_graph(x_values) -> None:
+        LineGraph("", "", "", "", x_values, y_values, y_values).create_line_graph()
+
+    print(f"{POINTS} timestamps")
+    print(f"{'step':<34}{'time (ms)':>11}")
+    for step, duration in (
+        ("strptime loop", measure(strptime_loop, values)),
+        ("pandas to_datetime ISO8601", measure(pandas_to_datetime, values)),
+        ("parse_timestamps", measure(parse_timestamps, values)),
+        ("line graph, timestamps", measure(line_graph, values)),
+        ("line graph, datetime64 dates", measure(line_graph, parse_timestamps(values))),
+    ):
+        print(f"{step:<34}{duration:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
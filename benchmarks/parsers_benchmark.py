@@ -0,0 +1,110 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+Benchmark of the html parsers on saved or sample scraped pages.
+
+Trimmed sample pages, following the markup of each website, are kept in
+benchmarks/pages: python -m benchmarks.parsers_benchmark
+To measure other copies, save each page in a folder with the name of its
+website, e.g. kamas_facile.html, try_and_judge.html, i_game_gold.html,
+mode_marchand.html then run: python -m benchmarks.parsers_benchmark <folder>
+"""
+
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+from src.utils.scraping.parsers import make_soup
+from src.utils.scraping.websites import LISTING_STRAINER, PRICE_STRAINER, strainer
+
+PAGES_STRAINERS = {
+    "kamas_facile.html": PRICE_STRAINER,
+    "try_and_judge.html": PRICE_STRAINER,
+    "i_game_gold.html": LISTING_STRAINER,
+    "mode_marchand.html": strainer("card-footer", "div"),
+}
+RUNS = 20
+# Folder of the trimmed sample pages
+PAGES_FOLDER = os.path.join(os.path.dirname(__file__), "pages")
+
+
+def measure(body: str, parser: str, parse_only) -> tuple:
+    """
+    Measure the parse time and the peak memory of a parser
+
+    Args:
+        body (str): the html page
+        parser (str): the parser name
+        parse_only (SoupStrainer | None): the strainer
+
+    Returns:
+        tuple: the mean parse time in ms and the peak memory in KiB
+    """
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        make_soup(body, parse_only, parser)
+    duration = (time.perf_counter() - start) / RUNS * 1000
+
+    tracemalloc.start()
+    make_soup(body, parse_only, parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return duration, peak / 1024
+
+
+def main(folder: str) -> None:
+    """
+    Print the parse time and peak memory of each parser for each page
+
+    Args:
+        folder (str): the folder of the saved pages
+    """
+    parsers = ["html.parser"]
+    if importlib.util.find_spec("lxml"):
+        parsers.append("lxml")
+
+    print(
+        f"{'page':<22}{'parser':<14}{'partial':<9}{'time (ms)':>11}{'peak (KiB)':>12}"
+    )
+    for filename, parse_only in PAGES_STRAINERS.items():
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as file:
+            body = file.read()
+
+        for parser in parsers:
+            for partial in (False, True):
+                duration, peak = measure(body, parser, parse_only if partial else None)
+                print(
+                    f"{filename:<22}{parser:<14}{str(partial):<9}"
+                    f"{duration:>11.2f}{peak:>12.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else PAGES_FOLDER)
@@ -25,9 +25,20 @@
 
 import os
 
-from src.utils.scraping.scraping import schedule_scrapping
+# The scraper runs in its own process (python -m src.scraper),
+# unless it is embedded in the web server
+if os.environ.get("EMBEDDED_SCRAPER", "0") == "1":
+    # pylint: disable=import-outside-toplevel
+    from src.utils.leader import run_as_leader
+    from src.utils.scraping.scraping import (
+        SCRAPING_INTERVALS,
+        parse_intervals,
+        schedule_scrapping,
+    )
 
-schedule_scrapping()
+    # Only one process of the host runs the scheduler, e.g. among gunicorn workers
+    intervals = parse_intervals(SCRAPING_INTERVALS)
+    election = run_as_leader(lambda: schedule_scrapping(intervals))
 debug = os.environ.get("BACKEND_HOST", "localhost") == "localhost"
 
 # pylint: disable=wrong-import-position
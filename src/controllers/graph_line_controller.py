@@ -23,16 +23,23 @@
 
 """Controller for the line graph."""
 
+import os
 from typing import List
 
 import dash
+import numpy as np
 
 from src.utils import global_variables
 from src.utils.enums import LineGraphScope
-from src.utils.graphs import LineGraph
-from src.utils.scraping.scraping import get_scope_kamas_value
+from src.utils.graphs import LineGraph, min_max_downsample
+from src.utils.history import scope_start
+from src.utils.kamas_values import get_scope_kamas_value
 from src.views.periodic_price_view.periodic_metrics_view import PeriodicMetricsView
 
+# Width in pixels the line graph is drawn on, a long scope keeps at most
+# the minimum and maximum of each series every 2 pixels
+PLOT_WIDTH = int(os.environ.get("PLOT_WIDTH", "1200"))
+
 
 def create_div_metrics(metric_lst: List[dict]) -> dash.html.Div:
     """
@@ -69,19 +76,25 @@ def graph_line_controller(value: int):
         px.line: the line graph
     """
     scope = LineGraphScope(value).name.lower()
-    kamas_dict = get_scope_kamas_value(
+    # The widest scope is loaded once, the others are sliced from it
+    kamas_columns = get_scope_kamas_value(
         server=global_variables.current_server_name,
-        scope=scope,
-    )
+        scope=LineGraphScope.YEAR.name.lower(),
+    ).since(np.datetime64(int(scope_start(scope)), "s"))
 
     line_graph = LineGraph(
         "Evolutions <br>du million de kamas",
         "",
         "Date UTC",
         "Valeurs estimées",
-        [dict["timestamp"] for dict in kamas_dict],
-        [dict["average"] for dict in kamas_dict],
-        [dict["min"] for dict in kamas_dict],
+        kamas_columns.dates,
+        kamas_columns.average,
+        kamas_columns.min,
+        min_max_downsample(
+            kamas_columns.dates,
+            [kamas_columns.average, kamas_columns.min],
+            PLOT_WIDTH // 2,
+        ),
     )
 
     graph, metrics = line_graph.create_line_graph()
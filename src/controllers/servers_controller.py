@@ -24,17 +24,72 @@
 """Server controller"""
 
 
+import concurrent.futures
+import logging
+import os
+from typing import Any
+
 import dash
 import numpy as np
 
 from src.utils.enums import Website
 from src.utils.graphs import create_graphs
-from src.utils.scraping.scraping import (
+from src.utils.kamas_values import (
+    PUBLISH_LISTENERS,
+    empty_kamas_value,
     get_two_last_kamas_value,
     get_yesterday_kamas_value,
 )
+from src.utils.read_cache import read_cache
 from src.views.server_view import server_view
 
+# Time in seconds to load the data of a page, the page is rendered
+# without the data not loaded in time
+PAGE_DEADLINE = float(os.environ.get("PAGE_DEADLINE", "3"))
+# Threads loading the data of the pages
+PAGE_LOADER = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PAGE_LOADER_WORKERS", "8")),
+    thread_name_prefix="page-loader",
+)
+# Threads building the figures of the pages ahead of the visitors,
+# apart from the page loader so they never delay a page
+PAGE_WARMER = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PAGE_WARMER_WORKERS", "2")),
+    thread_name_prefix="page-warmer",
+)
+
+
+def load_kamas_values(name: str) -> tuple:
+    """
+    Load the values of the day and of yesterday concurrently, the values of
+    the day not loaded before the deadline are the last cached ones, or empty
+    values when none is cached, the yesterday value not loaded in time is None
+
+    Args:
+        name (str): the server name
+
+    Returns:
+        tuple: the two last values of the day and the yesterday value
+    """
+    futures = {
+        "today": PAGE_LOADER.submit(get_two_last_kamas_value, server=name),
+        "yesterday": PAGE_LOADER.submit(get_yesterday_kamas_value, server=name),
+    }
+    done, _ = concurrent.futures.wait(futures.values(), timeout=PAGE_DEADLINE)
+    results = {}
+    for source, future in futures.items():
+        if future in done:
+            results[source] = future.result()
+        else:
+            logging.warning("%s kamas value of %s not loaded in time", source, name)
+            results[source] = None
+    if futures["today"] not in done:
+        results["today"] = read_cache.peek(("/today", name)) or [
+            empty_kamas_value(name),
+            empty_kamas_value(name),
+        ]
+    return results["today"], results["yesterday"]
+
 
 def get_best_price_server(day_kamas_dict: dict, best_price: float) -> tuple:
     """
@@ -109,7 +164,7 @@ def calculate_metrics(
     else:
         is_less_min = None
 
-    if yesterday_kamas_dict["average"]:
+    if yesterday_kamas_dict["average"] and last_day_kamas_dict["average"]:
         evolution = (
             round(
                 (last_day_kamas_dict["average"] - yesterday_kamas_dict["average"])
@@ -137,6 +192,104 @@ def calculate_metrics(
     )
 
 
+def split_kamas_values(
+    day_kamas_dict: list | None, yesterday_kamas_dict: dict
+) -> tuple:
+    """
+    Get the last and before last values of the day,
+    the yesterday value is used when there is no value of the day
+
+    Args:
+        day_kamas_dict (list | None): the two last values of the day
+        yesterday_kamas_dict (dict): the yesterday value
+
+    Returns:
+        tuple: the last and before last values of the day
+    """
+    if day_kamas_dict:
+        return day_kamas_dict[0], day_kamas_dict[1]
+    return yesterday_kamas_dict, yesterday_kamas_dict
+
+
+def page_figures(
+    name: str,
+    last_day_kamas_dict: dict,
+    before_last_day_kamas_dict: dict,
+    yesterday_kamas_dict: dict,
+) -> tuple:
+    """
+    Get the bar figure and the metrics of a server page,
+    cached until one of their values changes
+
+    Args:
+        name (str): the server name
+        last_day_kamas_dict (dict): dictionnary of the last value of the day
+        before_last_day_kamas_dict (dict): dictionnary of the before last value of the day
+        yesterday_kamas_dict (dict): dictionnary of the yesterday kamas
+
+    Returns:
+        tuple: the bar figure and the metrics
+    """
+    key = (
+        "page",
+        name,
+        last_day_kamas_dict["timestamp"],
+        before_last_day_kamas_dict["timestamp"],
+        yesterday_kamas_dict["timestamp"],
+    )
+    return read_cache.get(
+        key,
+        lambda: (
+            create_graphs(last_day_kamas_dict),
+            calculate_metrics(
+                last_day_kamas_dict, before_last_day_kamas_dict, yesterday_kamas_dict
+            ),
+        ),
+    )
+
+
+def warm_up_server(name: str, refresh: bool = True) -> None:
+    """
+    Build the page figure and metrics of a server from its new values,
+    so the next visitor is served from the cache
+
+    Args:
+        name (str): the server name
+        refresh (bool): read the values from the backend even if they are cached
+    """
+    day_kamas_dict = get_two_last_kamas_value(server=name, refresh=refresh)
+    yesterday_kamas_dict = get_yesterday_kamas_value(
+        server=name, refresh=refresh
+    ) or empty_kamas_value(name)
+    page_figures(
+        name,
+        *split_kamas_values(day_kamas_dict, yesterday_kamas_dict),
+        yesterday_kamas_dict,
+    )
+
+
+def warm_up_newer_values(key: tuple, previous: Any, value: Any) -> None:
+    """
+    Warm up the page of a server when the read cache stores values of the day
+    newer than the cached ones, so every web process warms its own pages
+    even when the scraper runs in another process
+
+    Args:
+        key (tuple): the key of the stored value
+        previous (Any): the previously cached value, None if there was none
+        value (Any): the stored value
+    """
+    if key[0] != "/today" or not previous or not value:
+        return
+    if previous[0]["timestamp"] != value[0]["timestamp"]:
+        PAGE_WARMER.submit(warm_up_server, key[1], False)
+
+
+# In the process running the scraper, the page is warmed up right after a publish
+PUBLISH_LISTENERS.append(lambda name: PAGE_WARMER.submit(warm_up_server, name))
+read_cache.listeners.append(warm_up_newer_values)
+
+
 # pylint: disable=too-many-locals
 def server(name: str) -> dash.html.Div:
     """
@@ -145,19 +298,13 @@ def server(name: str) -> dash.html.Div:
     Returns:
         html.Div: the html.Div for the boune server
     """
-    day_kamas_dict = get_two_last_kamas_value(server=name)
-    yesterday_kamas_dict = get_yesterday_kamas_value(server=name)
-
-    if day_kamas_dict:
-        last_day_kamas_dict = day_kamas_dict[0]
-        before_last_day_kamas_dict = day_kamas_dict[1]
-    else:
-        last_day_kamas_dict = yesterday_kamas_dict
-        before_last_day_kamas_dict = yesterday_kamas_dict
-
-    fig_day = create_graphs(last_day_kamas_dict)
+    day_kamas_dict, yesterday_kamas_dict = load_kamas_values(name)
+    yesterday_kamas_dict = yesterday_kamas_dict or empty_kamas_value(name)
+    last_day_kamas_dict, before_last_day_kamas_dict = split_kamas_values(
+        day_kamas_dict, yesterday_kamas_dict
+    )
 
-    (
+    fig_day, (
         best_price,
         best_price_server_name,
         website_link,
@@ -168,8 +315,8 @@ def server(name: str) -> dash.html.Div:
         deviation,
         deviation_related_to_average,
         evolution,
-    ) = calculate_metrics(
-        last_day_kamas_dict, before_last_day_kamas_dict, yesterday_kamas_dict
+    ) = page_figures(
+        name, last_day_kamas_dict, before_last_day_kamas_dict, yesterday_kamas_dict
     )
 
     return server_view(
@@ -0,0 +1,194 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Model for the kamas values of a scope"""
+
+import dataclasses
+from typing import List
+
+import numpy as np
+
+from src.utils.tools import parse_timestamps
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclasses.dataclass
+class KamasColumns:
+    """
+    Kamas values of a server stored by column, one row per timestamp,
+    the prices of the websites are a (websites, timestamps) matrix
+    with nan where a website has no price.
+    The timestamps are parsed once into UTC datetime64 dates
+    """
+
+    server: str
+    timestamps: np.ndarray
+    average: np.ndarray
+    max: np.ndarray
+    min: np.ndarray
+    sites: List[str] = dataclasses.field(default_factory=list)
+    prices: np.ndarray = dataclasses.field(
+        default_factory=lambda: np.empty((0, 0), dtype=float)
+    )
+    dates: np.ndarray | None = dataclasses.field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.dates is None:
+            self.dates = parse_timestamps(self.timestamps)
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "KamasColumns":
+        """
+        Create the kamas values from their columnar encoding
+
+        Args:
+            columns (dict): the decoded columnar body of the backend
+
+        Returns:
+            KamasColumns: the kamas values
+        """
+        return cls(
+            server=columns["server"],
+            timestamps=np.array(columns["timestamps"], dtype=str),
+            average=np.array(columns["average"], dtype=float),
+            max=np.array(columns["max"], dtype=float),
+            min=np.array(columns["min"], dtype=float),
+            sites=list(columns["sites"]),
+            prices=np.array(columns["prices"], dtype=float).reshape(
+                len(columns["sites"]), len(columns["timestamps"])
+            ),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: List[dict], server: str) -> "KamasColumns":
+        """
+        Create the kamas values from a list of kamas values
+
+        Args:
+            rows (List[dict]): the kamas values
+            server (str): the server name
+
+        Returns:
+            KamasColumns: the kamas values
+        """
+        sites = list(dict.fromkeys(site for row in rows for site in row["kamas_dict"]))
+        return cls(
+            server=server,
+            timestamps=np.array([row["timestamp"] for row in rows], dtype=str),
+            average=np.array([row["average"] for row in rows], dtype=float),
+            max=np.array([row["max"] for row in rows], dtype=float),
+            min=np.array([row["min"] for row in rows], dtype=float),
+            sites=sites,
+            prices=np.array(
+                [[row["kamas_dict"].get(site) for row in rows] for site in sites],
+                dtype=float,
+            ).reshape(len(sites), len(rows)),
+        )
+
+    @classmethod
+    def concat(cls, parts: List["KamasColumns"], server: str) -> "KamasColumns":
+        """
+        Join kamas values one after the other, the prices of the websites
+        missing from a part are nan
+
+        Args:
+            parts (List[KamasColumns]): the kamas values, at least one
+            server (str): the server name
+
+        Returns:
+            KamasColumns: the joined kamas values
+        """
+        sites = list(dict.fromkeys(site for part in parts for site in part.sites))
+        prices = np.full((len(sites), sum(len(part) for part in parts)), np.nan)
+        position = 0
+        for part in parts:
+            for site, site_prices in zip(part.sites, part.prices):
+                prices[sites.index(site), position : position + len(part)] = site_prices
+            position += len(part)
+        return cls(
+            server=server,
+            timestamps=np.concatenate([part.timestamps for part in parts]),
+            average=np.concatenate([part.average for part in parts]),
+            max=np.concatenate([part.max for part in parts]),
+            min=np.concatenate([part.min for part in parts]),
+            sites=sites,
+            prices=prices,
+            dates=np.concatenate([part.dates for part in parts]),
+        )
+
+    def to_columns(self) -> dict:
+        """
+        Get the columnar encoding of the kamas values
+
+        Returns:
+            dict: the columnar body, the missing prices are None
+        """
+        return {
+            "server": self.server,
+            "timestamps": self.timestamps.tolist(),
+            "average": self.average.tolist(),
+            "max": self.max.tolist(),
+            "min": self.min.tolist(),
+            "sites": self.sites,
+            "prices": [
+                [None if np.isnan(price) else price for price in site_prices]
+                for site_prices in self.prices.tolist()
+            ],
+        }
+
+    def take(self, indices: np.ndarray) -> "KamasColumns":
+        """
+        Get the kamas values at some positions
+
+        Args:
+            indices (np.ndarray): the positions, or a boolean mask
+
+        Returns:
+            KamasColumns: the selected kamas values
+        """
+        return dataclasses.replace(
+            self,
+            timestamps=self.timestamps[indices],
+            average=self.average[indices],
+            max=self.max[indices],
+            min=self.min[indices],
+            prices=self.prices[:, indices],
+            dates=self.dates[indices],
+        )
+
+    def since(self, date: np.datetime64) -> "KamasColumns":
+        """
+        Get the kamas values since a date, with a binary search on the dates
+        which must be sorted. The last value is kept if none is that recent
+
+        Args:
+            date (np.datetime64): the UTC date
+
+        Returns:
+            KamasColumns: the kamas values since the date
+        """
+        start = int(np.searchsorted(self.dates, date))
+        return self.take(slice(min(start, max(len(self) - 1, 0)), None))
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
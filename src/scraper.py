@@ -0,0 +1,64 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Entry point of the scraper, running apart from the Dash application."""
+
+import logging
+import os
+import time
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from src.utils.leader import LeaderElection
+from src.utils.scraping.scraping import (
+    SCRAPING_INTERVALS,
+    parse_intervals,
+    schedule_scrapping,
+)
+from src.utils.tools import logger_config
+
+# Number of sweeps which can run at the same time
+SCRAPER_WORKERS = int(os.environ.get("SCRAPER_WORKERS", "4"))
+
+
+def main() -> None:
+    """
+    Run the scraping scheduler until the process is stopped,
+    a single scraper is active per host
+    """
+    logger_config()
+    intervals = parse_intervals(SCRAPING_INTERVALS)
+    election = LeaderElection()
+    while not election.try_acquire():
+        logging.info("Another scraper is running, waiting to take over")
+        time.sleep(election.retry_interval)
+
+    scheduler = BlockingScheduler(
+        executors={"default": ThreadPoolExecutor(SCRAPER_WORKERS)}
+    )
+    schedule_scrapping(intervals, scheduler)
+
+
+if __name__ == "__main__":
+    main()
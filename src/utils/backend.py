@@ -23,10 +23,161 @@
 
 """Module for backend requests."""
 
+import collections
+import concurrent.futures
 import os
+import random
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Hashable, List, Tuple
 
+import numpy as np
 import requests
 
+from src.models.kamas_model import KamasColumns
+from src.utils.sessions import get_session
+from src.utils.tools import to_time
+
+# Media type of the columnar encoding of the kamas values of a scope
+COLUMNS_MEDIA_TYPE = "application/vnd.kamas.columns+json"
+# (connect, read) timeouts in seconds of each endpoint
+TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "/today": (3, 5),
+    "/yesterday": (3, 5),
+    "/kamas": (3, 20),
+    "/kamas/bulk": (3, 20),
+}
+DEFAULT_TIMEOUT = (3, 10)
+# Retries of the GET requests, waiting a random time up to BACKOFF * 2 ** attempt
+GET_RETRIES = 2
+BACKOFF = 0.5
+# Number of latencies kept per endpoint to compute the metrics
+LATENCY_SAMPLES = 1000
+
+
+class LatencyMetrics:
+    """
+    Latency of the requests of an endpoint
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, error: bool) -> None:
+        """
+        Record a request
+
+        Args:
+            latency (float): the duration of the request in seconds
+            error (bool): True if the request failed
+        """
+        with self._lock:
+            self.count += 1
+            self.errors += error
+            self.latencies.append(latency)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Get the metrics of the endpoint
+
+        Returns:
+            Dict[str, float]: the number of requests and errors, and the
+                mean, p95 and max latency in milliseconds of the last requests
+        """
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            count, errors = self.count, self.errors
+        if not latencies.size:
+            return {"count": count, "errors": errors}
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_ms": round(float(latencies.mean()), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "max_ms": round(float(latencies.max()), 2),
+        }
+
+
+# pylint: disable=too-few-public-methods
+class SingleFlight:
+    """
+    Coalesce the identical concurrent calls: the first caller runs the call,
+    the others wait for it and receive its result or its error
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        """
+        Run the call, or wait for the identical call already in flight
+
+        Args:
+            key (Hashable): the key identifying the call
+            call (Callable[[], Any]): the call
+
+        Returns:
+            Any: the result of the call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(call())
+        except BaseException as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+
+class RejectedPostError(requests.exceptions.RequestException):
+    """
+    Raised when the backend refused a kamas value (4xx answer),
+    posting it again would fail the same way
+    """
+
+
+class PartialPostError(requests.exceptions.RequestException):
+    """
+    Raised when the backend failed in the middle of posting several kamas
+    values, or refused some of them
+    """
+
+    def __init__(
+        self,
+        unposted: List[dict],
+        *args,
+        rejected: List[dict] | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.unposted = unposted
+        self.rejected = rejected or []
+
+
+def is_rejected(status: int) -> bool:
+    """
+    Check if an answer of the backend refuses the posted value for good,
+    the missing routes and the rate limits may succeed later
+
+    Args:
+        status (int): the status of the answer
+
+    Returns:
+        bool: True for the client errors not worth retrying
+    """
+    return 400 <= status < 500 and status not in (404, 405, 408, 429)
+
 
 class Backend:
     """
@@ -35,6 +186,74 @@ class Backend:
 
     def __init__(self):
         self.host = os.environ.get("BACKEND_HOST", "localhost")
+        self.port = os.environ.get("BACKEND_PORT", "8000")
+        self.bulk_supported = True
+        self.delta_supported = True
+        self.metrics: Dict[str, LatencyMetrics] = collections.defaultdict(
+            LatencyMetrics
+        )
+        self.single_flight = SingleFlight()
+
+    def latency_metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the latency metrics of each endpoint requested
+
+        Returns:
+            Dict[str, Dict[str, float]]: the metrics by endpoint
+        """
+        return {
+            endpoint: metrics.summary() for endpoint, metrics in self.metrics.items()
+        }
+
+    def _request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the backend with the timeouts of the endpoint,
+        the GET requests are retried on connection errors and server errors
+
+        Args:
+            method (str): the http method
+            endpoint (str): the endpoint path, e.g. /today
+            **kwargs: the arguments of the request (params, json)
+
+        Raises:
+            requests.exceptions.RequestException: if the backend is not reachable
+
+        Returns:
+            requests.Response: the response
+        """
+        url = f"{self.url}{endpoint}"
+        retries = GET_RETRIES if method == "GET" else 0
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = get_session(url).request(
+                    method,
+                    url,
+                    timeout=TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT),
+                    **kwargs,
+                )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                self.metrics[endpoint].record(time.perf_counter() - start, True)
+                if attempt == retries:
+                    raise
+            else:
+                error = response.status_code >= 500
+                self.metrics[endpoint].record(time.perf_counter() - start, error)
+                if not error or attempt == retries:
+                    return response
+            time.sleep(random.uniform(0, BACKOFF * 2**attempt))
+        raise requests.exceptions.RequestException("Endpoint is not available")
+
+    @property
+    def url(self) -> str:
+        """
+        Returns:
+            str: the url of the backend
+        """
+        return f"http://{self.host}:{self.port}"
 
     def backend_get_two_last_kamas_value(self, server: str) -> dict | None:
         """
@@ -49,7 +268,7 @@ class Backend:
         Returns:
             dict | None: the daily kamas value
         """
-        return self._get(":8000/today?server=", server)
+        return self._get("/today", {"server": server})
 
     def backend_get_yesterday_kamas_value(self, server: str) -> dict | None:
         """
@@ -64,25 +283,57 @@ class Backend:
         Returns:
             dict | None: the yesterday kamas value
         """
-        return self._get(":8000/yesterday?server=", server)
+        return self._get("/yesterday", {"server": server})
 
-    def _get(self, query: str, server: str) -> dict | None:
+    def _get(
+        self, endpoint: str, params: dict, columns: bool = False
+    ) -> dict | KamasColumns | None:
+        """
+        Get the kamas value from the backend,
+        the identical concurrent requests share a single request
+
+        Args:
+            endpoint (str): the endpoint path
+            params (dict): the query parameters
+            columns (bool): ask for the columnar encoding
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            dict | KamasColumns | None: the kamas value
+        """
+        key = (endpoint, columns, *sorted(params.items()))
+        return self.single_flight.do(
+            key, lambda: self._get_once(endpoint, params, columns)
+        )
+
+    def _get_once(
+        self, endpoint: str, params: dict, columns: bool = False
+    ) -> dict | KamasColumns | None:
         """
         Get the kamas value from the backend
 
         Args:
-            query (str): query to the backend
-            server (str): the server name
+            endpoint (str): the endpoint path
+            params (dict): the query parameters
+            columns (bool): ask for the columnar encoding
 
         Raises:
             requests.exceptions.RequestException: if the endpoint is not available
 
         Returns:
-            dict | None: the kamas value
+            dict | KamasColumns | None: the kamas value
         """
-        response = requests.get(url=f"http://{self.host}{query}{server}", timeout=10)
+        # requests already accepts the gzip compressed answers
+        headers = {}
+        if columns:
+            headers["Accept"] = f"{COLUMNS_MEDIA_TYPE}, application/json;q=0.9"
+        response = self._request("GET", endpoint, params=params, headers=headers)
         if response.status_code != 200:
             raise requests.exceptions.RequestException("Endpoint is not available")
+        if columns:
+            return decode_kamas_columns(response, params["server"])
         return response.json() or None
 
     def backend_get_scope_kamas_value(self, server: str, scope: str) -> dict | None:
@@ -99,17 +350,66 @@ class Backend:
         Returns:
             dict | None: all kamas value
         """
-        response = requests.get(
-            url=f"http://{self.host}:8000/kamas?server={server}&scope={scope}",
-            timeout=10,
+        return self._get("/kamas", {"server": server, "scope": scope})
+
+    def backend_get_scope_kamas_columns(
+        self, server: str, scope: str
+    ) -> KamasColumns | None:
+        """
+        backend endpoint to get all kamas value of a scope by column,
+        in the columnar encoding when the backend supports it
+
+        Args:
+            server (str): the server name
+            scope (str): the scope (day, week, month)
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            KamasColumns | None: all kamas value
+        """
+        return self._get("/kamas", {"server": server, "scope": scope}, columns=True)
+
+    def backend_get_scope_kamas_columns_after(
+        self, server: str, scope: str, after: str
+    ) -> KamasColumns | None:
+        """
+        backend endpoint to get the kamas values of a scope newer than a timestamp.
+        A backend not filtering the values answers the whole scope, its values
+        are then filtered here and the next pulls fetch the whole scope
+
+        Args:
+            server (str): the server name
+            scope (str): the scope (day, week, month)
+            after (str): the timestamp
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            KamasColumns | None: the newer kamas values, None if there is none
+        """
+        columns = self._get(
+            "/kamas", {"server": server, "scope": scope, "after": after}, columns=True
         )
-        if response.status_code != 200:
-            raise requests.exceptions.RequestException("Endpoint is not available")
-        return response.json() or None
+        if columns is None:
+            return None
+        times = np.array([to_time(timestamp) for timestamp in columns.timestamps])
+        if (times < to_time(after)).any():
+            self.delta_supported = False
+        columns = columns.take(times > to_time(after))
+        return columns if len(columns) else None
 
     # pylint: disable=too-many-arguments
     def backend_post_daily_kamas_value(
-        self, values: list, mean: float, max_: float, min_: float, server: str
+        self,
+        values: list,
+        mean: float,
+        max_: float,
+        min_: float,
+        server: str,
+        timestamp: str | None = None,
     ) -> None:
         """
         backend endpoint to post the daily kamas value
@@ -120,19 +420,139 @@ class Backend:
             max_ (float): max of kamas value
             min_ (float): min of kamas value
             server (str): the server name
+            timestamp (str | None): when the value was scraped, now if None
 
         Raises:
+            RejectedPostError: if the backend refused the value
             Exception: if the endpoint is not available
         """
-        body = {
-            "kamas_dict": values,
-            "average": mean,
-            "max": max_,
-            "min": min_,
-            "server": server,
-        }
-        response = requests.post(
-            url=f"http://{self.host}:8000/kamas", json=body, timeout=10
+        response = self._request(
+            "POST",
+            "/kamas",
+            json=kamas_body(values, mean, max_, min_, server, timestamp),
         )
+        if is_rejected(response.status_code):
+            raise RejectedPostError(f"Value refused ({response.status_code})")
         if response.status_code != 200:
             raise requests.exceptions.RequestException("Endpoint is not available")
+
+    def backend_post_bulk_kamas_value(self, bodies: List[dict]) -> None:
+        """
+        backend endpoint to post the kamas value of several servers at once,
+        falls back to a post per server if the backend has no bulk endpoint,
+        or to find the values it refused when it refused the bulk
+
+        Args:
+            bodies (List[dict]): the kamas value of each server, see kamas_body
+
+        Raises:
+            PartialPostError: if the backend failed after posting some of them,
+                with the bodies not posted, or refused some of them
+            requests.exceptions.RequestException: if none was posted
+        """
+        if not bodies:
+            return
+
+        if self.bulk_supported:
+            response = self._request("POST", "/kamas/bulk", json=bodies)
+            if response.status_code == 200:
+                return
+            if response.status_code in (404, 405):
+                self.bulk_supported = False
+            elif not is_rejected(response.status_code):
+                raise requests.exceptions.RequestException("Endpoint is not available")
+
+        rejected: List[dict] = []
+        for index, body in enumerate(bodies):
+            try:
+                self.backend_post_daily_kamas_value(
+                    body["kamas_dict"],
+                    body["average"],
+                    body["max"],
+                    body["min"],
+                    body["server"],
+                    body.get("timestamp"),
+                )
+            except RejectedPostError:
+                rejected.append(body)
+            except requests.exceptions.RequestException as e:
+                if not index:
+                    raise
+                raise PartialPostError(bodies[index:], str(e), rejected=rejected) from e
+        if rejected:
+            raise PartialPostError([], "Values refused", rejected=rejected)
+
+
+# pylint: disable=too-many-arguments
+def kamas_body(
+    values: dict,
+    mean: float,
+    max_: float,
+    min_: float,
+    server: str,
+    timestamp: str | None = None,
+) -> dict:
+    """
+    Build the body posting the kamas value of a server
+
+    Args:
+        values (dict): kamas value of each website
+        mean (float): mean of kamas value
+        max_ (float): max of kamas value
+        min_ (float): min of kamas value
+        server (str): the server name
+        timestamp (str | None): when the value was scraped, set by the backend if None
+
+    Returns:
+        dict: the body
+    """
+    body = {
+        "kamas_dict": values,
+        "average": mean,
+        "max": max_,
+        "min": min_,
+        "server": server,
+    }
+    if timestamp is not None:
+        body["timestamp"] = timestamp
+    return body
+
+
+def decode_kamas_columns(
+    response: requests.Response, server: str
+) -> KamasColumns | None:
+    """
+    Decode the kamas values of a scope into columns, the backends not
+    supporting the columnar encoding answer with a list of kamas values
+
+    Args:
+        response (requests.Response): the response of the backend
+        server (str): the server name
+
+    Returns:
+        KamasColumns | None: the kamas values, None if there is none
+    """
+    if response.headers.get("Content-Type", "").startswith(COLUMNS_MEDIA_TYPE):
+        columns = KamasColumns.from_columns(response.json())
+    else:
+        columns = KamasColumns.from_rows(response.json() or [], server)
+    return columns if len(columns) else None
+
+
+_backend: Backend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """
+    Get the backend client shared by the whole process,
+    so its connections and metrics are reused between requests
+
+    Returns:
+        Backend: the shared backend client
+    """
+    global _backend  # pylint: disable=global-statement
+    with _backend_lock:
+        if _backend is None:
+            _backend = Backend()
+        return _backend
@@ -23,8 +23,7 @@
 
 """Module for plotly graphs."""
 
-import datetime
-from typing import Dict
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
@@ -33,6 +32,7 @@ import plotly.graph_objects as go
 
 from src.models.graph_model import GraphModel
 from src.utils.enums import Website
+from src.utils.tools import parse_timestamps
 
 
 def create_graphs(last_day_kamas_dict: dict) -> tuple:
@@ -216,9 +216,46 @@ class BarGraph:
         )
 
 
+def min_max_downsample(
+    x_values: np.ndarray, series: List[np.ndarray], buckets: int
+) -> np.ndarray:
+    """
+    Select the points to plot: the x range is split into buckets of equal
+    width, and the minimum and maximum of each series are kept in each
+    bucket, with the first and last points, so the peaks and troughs stay visible
+
+    Args:
+        x_values (np.ndarray): the sorted x values (numbers or datetime64)
+        series (List[np.ndarray]): the y values of each series
+        buckets (int): the number of buckets, e.g. half the plot width in pixels
+
+    Returns:
+        np.ndarray: the sorted indices of the points to plot
+    """
+    size = len(x_values)
+    if size <= 2 * len(series) * buckets:
+        return np.arange(size)
+
+    x_values = np.asarray(x_values)
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype("datetime64[us]").astype(np.int64)
+    span = max(x_values[-1] - x_values[0], 1)
+    bins = ((x_values - x_values[0]) * buckets // span).clip(0, buckets - 1)
+
+    kept = [np.array([0, size - 1])]
+    for values in series:
+        order = np.lexsort((np.asarray(values), bins))
+        sorted_bins = bins[order]
+        changes = sorted_bins[1:] != sorted_bins[:-1]
+        kept.append(order[np.r_[True, changes]])
+        kept.append(order[np.r_[changes, True]])
+    return np.unique(np.concatenate(kept))
+
+
 class LineGraph:
     """
-    Line graph, with average value and deviation value
+    Line graph, with average value and deviation value,
+    the metrics are computed on all the values even if only some are plotted
     """
 
     # pylint: disable=too-many-arguments
@@ -232,6 +269,7 @@ class LineGraph:
         x_values: list,
         y_avg_values: list,
         y_min_values: list,
+        plotted: np.ndarray | None = None,
     ):
         self.title = title
         self.description = description
@@ -240,6 +278,7 @@ class LineGraph:
         self.x_values = x_values
         self.y_avg_values = y_avg_values
         self.y_min_values = y_min_values
+        self.plotted = plotted
 
     def create_line_graph(self) -> px.line:
         """
@@ -248,22 +287,27 @@ class LineGraph:
         Returns:
             px.line: the line graph
         """
-        x_values = [
-            datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S.%f%z")
-            for date in self.x_values
-        ]
+        x_values = np.asarray(self.x_values)
+        y_avg_values = np.asarray(self.y_avg_values)
+        y_min_values = np.asarray(self.y_min_values)
+        if self.plotted is not None:
+            x_values = x_values[self.plotted]
+            y_avg_values = y_avg_values[self.plotted]
+            y_min_values = y_min_values[self.plotted]
+        if not np.issubdtype(x_values.dtype, np.datetime64):
+            x_values = parse_timestamps(x_values)
 
         fig = go.Figure()
         fig.add_scatter(
             x=x_values,
-            y=self.y_avg_values,
+            y=y_avg_values,
             name="Prix moyen",
             marker={"color": "black"},
         )
 
         fig.add_scatter(
             x=x_values,
-            y=self.y_min_values,
+            y=y_min_values,
             name="Prix minimum",
             marker={"color": "#D3D3D3"},
         )
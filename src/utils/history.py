@@ -0,0 +1,368 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Local time-series store of the kamas values history of each server."""
+
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from src.models.kamas_model import KamasColumns
+from src.utils.sqlite_store import SqliteStore
+from src.utils.tools import to_time
+
+# Path of the sqlite file storing the history
+HISTORY_PATH = os.environ.get("HISTORY_PATH", "kamas_history.sqlite")
+# Time in seconds the history of a server is answered locally after a backend pull
+HISTORY_SYNC_INTERVAL = float(os.environ.get("HISTORY_SYNC_INTERVAL", "300"))
+# Time in seconds between two pulls of the whole history of a server, so the
+# values posted late with their scrape time (e.g. replayed from the spool),
+# older than the last delta pull, reach the local history
+HISTORY_FULL_SYNC_INTERVAL = float(
+    os.environ.get("HISTORY_FULL_SYNC_INTERVAL", "10800")
+)
+# Number of days of each line graph scope
+SCOPE_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 31,
+    "three_months": 92,
+    "six_months": 183,
+    "year": 365,
+}
+
+
+def to_date(posix_time: float) -> np.datetime64:
+    """
+    Convert a POSIX time to a UTC date
+
+    Args:
+        posix_time (float): the POSIX time
+
+    Returns:
+        np.datetime64: the UTC date
+    """
+    return np.datetime64(round(posix_time * 1e6), "us")
+
+
+def scope_start(scope: str) -> float:
+    """
+    Get the time the scope starts at
+
+    Args:
+        scope (str): the scope (day, week, month)
+
+    Returns:
+        float: the POSIX time of the start of the scope
+    """
+    return time.time() - SCOPE_DAYS.get(scope, SCOPE_DAYS["year"]) * 86400
+
+
+class KamasHistory(SqliteStore):
+    """
+    Store the kamas values of each server indexed by (server, time),
+    filled by the published values and the values pulled from the backend.
+    The backend values replace the local ones of the range they cover.
+    The values of each queried server are mirrored in memory by column,
+    and read again from the file once another process changed it
+    """
+
+    TABLES = [
+        "CREATE TABLE IF NOT EXISTS kamas ("
+        "server TEXT NOT NULL, time REAL NOT NULL, timestamp TEXT NOT NULL, "
+        "average REAL NOT NULL, max REAL NOT NULL, min REAL NOT NULL, "
+        "kamas_dict TEXT NOT NULL, PRIMARY KEY (server, time)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS syncs ("
+        "server TEXT PRIMARY KEY, covered_from REAL NOT NULL, "
+        "synced_at REAL NOT NULL, synced_until TEXT)",
+    ]
+
+    def __init__(self, path: str = HISTORY_PATH):
+        super().__init__(path)
+        # POSIX time of the last pull of the whole history of each server,
+        # the first pull of each process pulls the whole history
+        self._full_syncs: Dict[str, float] = {}
+        self._mirrors: Dict[str, KamasColumns] = {}
+        self._data_version: int | None = None
+
+    def append(self, bodies: List[dict]) -> None:
+        """
+        Store published kamas values
+
+        Args:
+            bodies (List[dict]): the kamas values, with their timestamp
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO kamas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        body["server"],
+                        to_time(body["timestamp"]),
+                        body["timestamp"],
+                        body["average"],
+                        body["max"],
+                        body["min"],
+                        json.dumps(body["kamas_dict"]),
+                    )
+                    for body in bodies
+                ],
+            )
+            connection.commit()
+            for server in dict.fromkeys(body["server"] for body in bodies):
+                columns = KamasColumns.from_rows(
+                    [body for body in bodies if body["server"] == server], server
+                )
+                self._splice(
+                    server, columns, lambda dates, c=columns: ~np.isin(dates, c.dates)
+                )
+
+    def store(
+        self,
+        server: str,
+        columns: KamasColumns | None,
+        covered_from: float,
+        after: str | None = None,
+    ) -> None:
+        """
+        Store the kamas values pulled from the backend,
+        replacing the local values since the start of the pulled range.
+        With after, only the values after this timestamp were pulled (delta sync)
+
+        Args:
+            server (str): the server name
+            columns (KamasColumns | None): the kamas values
+            covered_from (float): the POSIX time the pulled range starts at
+            after (str | None): the newest timestamp of the previous pull
+        """
+        synced_until = None
+        rows = []
+        if columns is not None and len(columns):
+            synced_until = str(columns.timestamps[int(np.argmax(columns.dates))])
+            rows = [
+                (
+                    server,
+                    to_time(timestamp),
+                    timestamp,
+                    average,
+                    max_,
+                    min_,
+                    json.dumps(
+                        {
+                            site: price
+                            for site, price in zip(columns.sites, prices)
+                            if not math.isnan(price)
+                        }
+                    ),
+                )
+                for timestamp, average, max_, min_, prices in zip(
+                    columns.timestamps.tolist(),
+                    columns.average.tolist(),
+                    columns.max.tolist(),
+                    columns.min.tolist(),
+                    columns.prices.T.tolist(),
+                )
+            ]
+
+        with self._lock:
+            connection = self._connect()
+            if after is None:
+                state = connection.execute(
+                    "SELECT covered_from FROM syncs WHERE server = ?", (server,)
+                ).fetchone()
+                if state is None or covered_from <= state[0]:
+                    self._full_syncs[server] = time.time()
+                connection.execute(
+                    "DELETE FROM kamas WHERE server = ? AND time >= ?",
+                    (server, covered_from),
+                )
+            else:
+                connection.execute(
+                    "DELETE FROM kamas WHERE server = ? AND time > ?",
+                    (server, to_time(after)),
+                )
+            connection.executemany(
+                "INSERT OR REPLACE INTO kamas VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            connection.execute(
+                "INSERT INTO syncs VALUES (?, ?, ?, ?) ON CONFLICT (server) DO UPDATE "
+                "SET covered_from = MIN(covered_from, excluded.covered_from), "
+                "synced_at = excluded.synced_at, "
+                "synced_until = COALESCE(excluded.synced_until, synced_until)",
+                (server, covered_from, time.time(), synced_until),
+            )
+            connection.commit()
+            since = to_date(covered_from if after is None else to_time(after))
+            if after is None:
+                self._splice(server, columns, lambda dates: dates < since)
+            else:
+                self._splice(server, columns, lambda dates: dates <= since)
+
+    def sync_state(self, server: str) -> Tuple[float, float, str | None] | None:
+        """
+        Get the state of the last pull of the server history
+
+        Args:
+            server (str): the server name
+
+        Returns:
+            Tuple[float, float, str | None] | None: the POSIX time the history
+                is covered from, the POSIX time of the last pull and the newest
+                pulled timestamp, None if the history was never pulled
+        """
+        with self._lock:
+            return (
+                self._connect()
+                .execute(
+                    "SELECT covered_from, synced_at, synced_until FROM syncs "
+                    "WHERE server = ?",
+                    (server,),
+                )
+                .fetchone()
+            )
+
+    def needs_full_sync(self, server: str) -> bool:
+        """
+        Check if the whole history of the server must be pulled again
+
+        Args:
+            server (str): the server name
+
+        Returns:
+            bool: True if it was not pulled recently by this process
+        """
+        with self._lock:
+            synced_at = self._full_syncs.get(server, 0.0)
+        return time.time() - synced_at >= HISTORY_FULL_SYNC_INTERVAL
+
+    def is_synced(self, server: str, start: float) -> bool:
+        """
+        Check if the history of the server since a time can be answered locally
+
+        Args:
+            server (str): the server name
+            start (float): the POSIX time
+
+        Returns:
+            bool: True if the range was pulled from the backend recently
+        """
+        state = self.sync_state(server)
+        return (
+            state is not None
+            and state[0] <= start
+            and time.time() - state[1] < HISTORY_SYNC_INTERVAL
+        )
+
+    def query(self, server: str, start: float) -> KamasColumns:
+        """
+        Get the kamas values of a server since a time
+
+        Args:
+            server (str): the server name
+            start (float): the POSIX time
+
+        Returns:
+            KamasColumns: the kamas values, sorted by time
+        """
+        with self._lock:
+            connection = self._connect()
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._mirrors.clear()
+                self._data_version = data_version
+            if server not in self._mirrors:
+                self._mirrors[server] = self._load(server)
+            columns = self._mirrors[server]
+        return columns.take(
+            slice(int(np.searchsorted(columns.dates, to_date(start))), None)
+        )
+
+    def _load(self, server: str) -> KamasColumns:
+        """
+        Read all the kamas values of a server from the file
+
+        Args:
+            server (str): the server name
+
+        Returns:
+            KamasColumns: the kamas values, sorted by time
+        """
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT time, timestamp, average, max, min, kamas_dict FROM kamas "
+                "WHERE server = ? ORDER BY time",
+                (server,),
+            )
+            .fetchall()
+        )
+        if not rows:
+            return KamasColumns.from_rows([], server)
+
+        times, timestamps, average, max_, min_, kamas_dicts = zip(*rows)
+        kamas_dicts = json.loads(f"[{','.join(kamas_dicts)}]")
+        sites = list(dict.fromkeys(site for prices in kamas_dicts for site in prices))
+        return KamasColumns(
+            server=server,
+            timestamps=np.array(timestamps, dtype=str),
+            average=np.array(average, dtype=float),
+            max=np.array(max_, dtype=float),
+            min=np.array(min_, dtype=float),
+            sites=sites,
+            prices=np.array(
+                [[prices.get(site) for prices in kamas_dicts] for site in sites],
+                dtype=float,
+            ).reshape(len(sites), len(rows)),
+            dates=np.round(np.array(times) * 1e6).astype("datetime64[us]"),
+        )
+
+    def _splice(
+        self,
+        server: str,
+        columns: KamasColumns | None,
+        keep: Callable[[np.ndarray], np.ndarray],
+    ) -> None:
+        """
+        Apply a change of the file to the mirrored values of a server
+
+        Args:
+            server (str): the server name
+            columns (KamasColumns | None): the stored kamas values
+            keep (Callable[[np.ndarray], np.ndarray]): the mask of the mirrored
+                values kept, from their dates
+        """
+        if (mirror := self._mirrors.get(server)) is None:
+            return
+        parts = [mirror.take(keep(mirror.dates))]
+        if columns is not None and len(columns):
+            parts.append(columns)
+        columns = KamasColumns.concat(parts, server)
+        self._mirrors[server] = columns.take(np.argsort(columns.dates, kind="stable"))
+
+
+history = KamasHistory()
@@ -0,0 +1,206 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Kamas values read from the backend, through the read cache and the history."""
+
+import logging
+from typing import Callable, List
+
+import requests
+
+from src.models.kamas_model import KamasColumns
+from src.utils.backend import Backend, get_backend
+from src.utils.history import history, scope_start
+from src.utils.read_cache import read_cache
+
+# Called with the server name after a kamas value was published
+PUBLISH_LISTENERS: List[Callable[[str], None]] = []
+
+
+def get_two_last_kamas_value(server: str, refresh: bool = False) -> dict | None:
+    """
+    Get the daily kamas value
+
+    Args:
+        server (str): the server name
+        refresh (bool): read the value from the backend even if it is cached
+
+    Returns:
+        dict | None: the daily kamas value
+    """
+    backend = get_backend()
+    try:
+        if response := read_cache.get(
+            ("/today", server),
+            lambda: backend.backend_get_two_last_kamas_value(server),
+            refresh,
+        ):
+            return response
+    except requests.exceptions.RequestException as e:
+        logging.error("Error while getting daily kamas value: %s", e)
+    return None
+
+
+def get_yesterday_kamas_value(server: str, refresh: bool = False) -> dict | None:
+    """
+    Get the yesterday kamas value
+
+    Args:
+        server (str): the server name
+        refresh (bool): read the value from the backend even if it is cached
+
+    Returns:
+        dict | None: the yesterday kamas value
+    """
+    backend = get_backend()
+    try:
+        if response := read_cache.get(
+            ("/yesterday", server),
+            lambda: backend.backend_get_yesterday_kamas_value(server),
+            refresh,
+        ):
+            return response
+    except requests.exceptions.RequestException as e:
+        logging.error("Error while getting yesterday kamas value: %s", e)
+
+    return empty_kamas_value(server)
+
+
+def empty_kamas_value(server: str) -> dict:
+    """
+    Get the kamas value displayed when the backend has none
+
+    Args:
+        server (str): the server name
+
+    Returns:
+        dict: the empty kamas value
+    """
+    return {
+        "timestamp": "1970-01-01T00:00:00.0+00:00",
+        "average": 0,
+        "max": 0,
+        "min": 0,
+        "kamas_dict": {"": 0},
+        "server": server,
+    }
+
+
+def get_scope_kamas_value(server: str, scope: str) -> KamasColumns:
+    """
+    Get all kamas value of a scope by column
+
+    Args:
+        server (str): the server name
+        scope (str): the scope (day, week, month)
+
+    Returns:
+        KamasColumns: all kamas value
+    """
+    backend = get_backend()
+    try:
+        if response := read_cache.get(
+            ("/kamas", server, scope),
+            lambda: load_scope_kamas_value(backend, server, scope),
+        ):
+            return response
+    except requests.exceptions.RequestException as e:
+        logging.error("Error while getting yesterday kamas value: %s", e)
+
+    return KamasColumns.from_rows(
+        [
+            {
+                "timestamp": "1970-01-01T00:00:00.0+00:00",
+                "average": 0,
+                "max": 0,
+                "min": 0,
+                "kamas_dict": {"None": 0},
+                "server": server,
+            }
+        ],
+        server,
+    )
+
+
+def load_scope_kamas_value(
+    backend: Backend, server: str, scope: str
+) -> KamasColumns | None:
+    """
+    Get all kamas value of a scope from the local history,
+    the scope is pulled from the backend when it was not recently
+
+    Args:
+        backend (Backend): the backend
+        server (str): the server name
+        scope (str): the scope (day, week, month)
+
+    Raises:
+        requests.exceptions.RequestException: if the backend is not available
+            and the local history has no value
+
+    Returns:
+        KamasColumns | None: all kamas value, None if there is none
+    """
+    start = scope_start(scope)
+    if not history.is_synced(server, start):
+        try:
+            pull_scope_kamas_value(backend, server, scope, start)
+        except requests.exceptions.RequestException as e:
+            if not history.query(server, start):
+                raise
+            logging.warning("Local history of %s used, backend error: %s", server, e)
+    return history.query(server, start) or None
+
+
+def pull_scope_kamas_value(
+    backend: Backend, server: str, scope: str, start: float
+) -> None:
+    """
+    Pull the kamas values of a scope from the backend into the local history.
+    Once the scope is in the history, only the values newer than the last
+    pull are asked for, unless the backend can not filter them. The whole
+    history is pulled again periodically, for the values posted late
+    with a timestamp older than the last pull
+
+    Args:
+        backend (Backend): the backend
+        server (str): the server name
+        scope (str): the scope (day, week, month)
+        start (float): the POSIX time the scope starts at
+
+    Raises:
+        requests.exceptions.RequestException: if the backend is not available
+    """
+    state = history.sync_state(server)
+    if state and state[2] and history.needs_full_sync(server):
+        columns = backend.backend_get_scope_kamas_columns(server, "year")
+        history.store(server, columns, scope_start("year"))
+    elif backend.delta_supported and state and state[0] <= start and state[2]:
+        # The widest scope, so the values older than the asked scope are not missed
+        columns = backend.backend_get_scope_kamas_columns_after(
+            server, "year", state[2]
+        )
+        history.store(server, columns, start, after=state[2])
+    else:
+        columns = backend.backend_get_scope_kamas_columns(server, scope)
+        history.store(server, columns, start)
@@ -0,0 +1,132 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Leader election between the processes of a host."""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, TextIO
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # pylint: disable=invalid-name
+
+# File locked by the leader process, shared by all the processes of the host
+LOCK_PATH = os.environ.get(
+    "LEADER_LOCK_PATH",
+    os.path.join(tempfile.gettempdir(), "kamas_dashboard_leader.lock"),
+)
+# Time in seconds between two attempts of a follower to become the leader
+RETRY_INTERVAL = 30
+
+
+class LeaderElection:
+    """
+    Elect a single leader between the processes of a host with a file lock.
+    The lock is released by the system when the leader dies, so a follower
+    takes over at its next attempt
+    """
+
+    def __init__(self, path: str = LOCK_PATH, retry_interval: float = RETRY_INTERVAL):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._file: TextIO | None = None
+
+    def try_acquire(self) -> bool:
+        """
+        Try to become the leader, without blocking
+
+        Returns:
+            bool: True if this process is the leader
+        """
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+
+        # pylint: disable=consider-using-with
+        file = open(self.path, "a+", encoding="utf-8")
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+
+        file.truncate(0)
+        file.write(str(os.getpid()))
+        file.flush()
+        self._file = file
+        self.is_leader = True
+        return True
+
+    def release(self) -> None:
+        """
+        Stop being the leader
+        """
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def run(self, on_elected: Callable) -> None:
+        """
+        Call the function once this process becomes the leader,
+        the followers keep trying in a background thread
+
+        Args:
+            on_elected (Callable): the function to call when elected
+        """
+        if self.try_acquire():
+            logging.info("Process %s elected leader", os.getpid())
+            on_elected()
+            return
+
+        def _wait_election() -> None:
+            while not self.try_acquire():
+                time.sleep(self.retry_interval)
+            logging.info("Process %s elected leader after failover", os.getpid())
+            on_elected()
+
+        threading.Thread(target=_wait_election, name="leader", daemon=True).start()
+
+
+def run_as_leader(on_elected: Callable) -> LeaderElection:
+    """
+    Call the function only in the leader process of the host
+
+    Args:
+        on_elected (Callable): the function to call when elected
+
+    Returns:
+        LeaderElection: the election of this process
+    """
+    election = LeaderElection()
+    election.run(on_elected)
+    return election
@@ -0,0 +1,196 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""In-process cache of the values read from the backend."""
+
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Set, Tuple
+
+# Time in seconds a value read from each endpoint is fresh
+READ_CACHE_TTLS: Dict[str, float] = {
+    "/today": float(os.environ.get("READ_CACHE_TODAY_TTL", "60")),
+    "/yesterday": float(os.environ.get("READ_CACHE_YESTERDAY_TTL", "900")),
+    "/kamas": float(os.environ.get("READ_CACHE_KAMAS_TTL", "300")),
+    # Figures and metrics of the pages, keyed by the timestamps of their values
+    "page": float(os.environ.get("READ_CACHE_PAGE_TTL", "3600")),
+}
+# Time in seconds a value is still served once expired, while it is refreshed
+READ_CACHE_STALE_TIME = float(os.environ.get("READ_CACHE_STALE_TIME", "1800"))
+# Maximum number of values kept, the least recently used are evicted
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("READ_CACHE_MAX_ENTRIES", "512"))
+
+
+# pylint: disable=too-many-instance-attributes
+class ReadCache:
+    """
+    Cache of the backend reads keyed by (endpoint, server, scope),
+    an expired value is still served while it is refreshed in the background
+    (stale-while-revalidate)
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float] | None = None,
+        stale_time: float = READ_CACHE_STALE_TIME,
+        max_entries: int = READ_CACHE_MAX_ENTRIES,
+    ):
+        self.ttls = READ_CACHE_TTLS if ttls is None else ttls
+        self.stale_time = stale_time
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict[
+            Tuple[Hashable, ...], Tuple[Any, float]
+        ] = collections.OrderedDict()
+        self._refreshing: Set[Tuple[Hashable, ...]] = set()
+        self._lock = threading.Lock()
+        # Called with the key, the previous value (None if it was not cached)
+        # and the new value each time a value is stored
+        self.listeners: List[Callable[[Tuple[Hashable, ...], Any, Any], None]] = []
+
+    def get(
+        self, key: Tuple[Hashable, ...], load: Callable[[], Any], refresh: bool = False
+    ) -> Any:
+        """
+        Get a value from the cache, loading it when it is missing or too old
+
+        Args:
+            key (Tuple[Hashable, ...]): the key, starting with the endpoint
+            load (Callable[[], Any]): read the value from the backend
+            refresh (bool): load the value even if it is cached
+
+        Raises:
+            requests.exceptions.RequestException: if the value is not cached
+                and the backend is not available
+
+        Returns:
+            Any: the value
+        """
+        ttl = self.ttls.get(key[0], 0)
+        with self._lock:
+            if key in self._entries and not refresh:
+                value, stored_at = self._entries[key]
+                age = time.monotonic() - stored_at
+                if age < ttl + self.stale_time:
+                    self._entries.move_to_end(key)
+                    if age < ttl:
+                        self.hits += 1
+                        return value
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, load), daemon=True
+                        ).start()
+                    return value
+            self.misses += 1
+        value = load()
+        self.store(key, value)
+        return value
+
+    def _refresh(self, key: Tuple[Hashable, ...], load: Callable[[], Any]) -> None:
+        """
+        Read again an expired value from the backend
+
+        Args:
+            key (Tuple[Hashable, ...]): the key
+            load (Callable[[], Any]): read the value from the backend
+        """
+        try:
+            self.store(key, load())
+        except Exception as e:  # pylint: disable=broad-except
+            logging.warning("Error while refreshing %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def peek(self, key: Tuple[Hashable, ...]) -> Any:
+        """
+        Get the last value stored in the cache, whatever its age
+
+        Args:
+            key (Tuple[Hashable, ...]): the key
+
+        Returns:
+            Any: the value, None if it is not cached
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+        return None
+
+    def store(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        """
+        Store a value in the cache, evicting the least recently used values,
+        and notify the listeners
+
+        Args:
+            key (Tuple[Hashable, ...]): the key
+            value (Any): the value
+        """
+        with self._lock:
+            previous = self._entries.get(key, (None, 0))[0]
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        for listener in self.listeners:
+            listener(key, previous, value)
+
+    def invalidate(self, server: str) -> None:
+        """
+        Expire the values of a server, e.g. when a new value was published,
+        they are still served while they are refreshed
+
+        Args:
+            server (str): the server name
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key, (value, stored_at) in self._entries.items():
+                if key[1] == server:
+                    expired_at = now - self.ttls.get(key[0], 0)
+                    self._entries[key] = (value, min(stored_at, expired_at))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the statistics of the cache
+
+        Returns:
+            Dict[str, int]: the number of hits, stale hits, misses and cached values
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+read_cache = ReadCache()
@@ -0,0 +1,345 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Asyncio engine to scrap kamas price from differents websites"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Mapping, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+
+from src.models.scraping_model import ScrapingRequest
+from src.utils.scraping.page_cache import page_cache
+from src.utils.scraping.resilience import (
+    WebsiteGuard,
+    WebsiteSkipped,
+    get_website_guard,
+)
+from src.utils.scraping.websites import (
+    STREAM_CHUNK_SIZE,
+    STREAM_DRAIN_SIZE,
+    STREAMING,
+    WEBSITES_SCRAPERS,
+    log_scraping_error,
+    parse_response,
+)
+
+# Maximum number of requests in flight for the same website
+HOST_CONCURRENCY = 4
+# Maximum time in seconds given to all the websites of a sweep to answer
+SCRAPING_DEADLINE = 15
+
+T = TypeVar("T")
+
+
+class ScrapingEngine:
+    """
+    Send the scraping requests of a sweep on a single event loop,
+    with a limited number of requests in flight per website
+    """
+
+    def __init__(self, host_concurrency: int = HOST_CONCURRENCY):
+        self.host_concurrency = host_concurrency
+        self.session: aiohttp.ClientSession | None = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.pages: Dict[str, asyncio.Task] = {}
+        self.probes: Dict[WebsiteGuard, asyncio.Future] = {}
+
+    async def __aenter__(self) -> "ScrapingEngine":
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=self.host_concurrency),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.session.close()
+
+    async def fetch(self, request: ScrapingRequest, name: str | None = None) -> str:
+        """
+        Send the request to the website, a page requested by several
+        servers (e.g. a listing page) is downloaded only once per sweep,
+        so its failure is counted once by the circuit breaker
+
+        Args:
+            request (ScrapingRequest): the request to send
+            name (str | None): the website name, None to send it unguarded
+
+        Returns:
+            str: the body of the response
+        """
+        if request.method != "GET" or request.data:
+            return await self.guarded(name, lambda: self._fetch(request))
+
+        if request.url not in self.pages:
+            self.pages[request.url] = asyncio.create_task(
+                self.guarded(name, lambda: self._fetch(request))
+            )
+        return await self.pages[request.url]
+
+    async def guarded(self, name: str | None, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Send a request through the rate limiter and circuit breaker of the
+        website. While a probe request is in flight after the recovery time,
+        the other requests to the website wait for its result, and are sent
+        only if it succeeded
+
+        Args:
+            name (str | None): the website name, None to send it unguarded
+            send (Callable[[], Awaitable[T]]): send the request
+
+        Raises:
+            WebsiteSkipped: if the circuit of the website is open
+
+        Returns:
+            T: the result of the request
+        """
+        if name is None:
+            return await send()
+
+        guard = get_website_guard(name)
+        while (probe := self.probes.get(guard)) is not None:
+            await asyncio.wait([probe])
+        if not guard.breaker.allow():
+            raise WebsiteSkipped("Circuit open, website skipped")
+        if guard.breaker.probing:
+            probe = self.probes[guard] = asyncio.get_running_loop().create_future()
+
+        sent = False
+        try:
+            await asyncio.sleep(guard.bucket.reserve())
+            sent = True
+            with guard.attempt():
+                return await send()
+        finally:
+            if probe is not None:
+                if not sent:
+                    # Cancelled while rate limited, another request may probe
+                    guard.breaker.release_probe()
+                del self.probes[guard]
+                probe.set_result(None)
+
+    async def _fetch(self, request: ScrapingRequest) -> str:
+        """
+        Send the request to the website
+
+        Args:
+            request (ScrapingRequest): the request to send
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            str: the body of the response
+        """
+        status, _, body = await self.send(request)
+        if status != 200:
+            raise requests.exceptions.RequestException("Endpoint is not available")
+        return body
+
+    async def _send_conditional(
+        self, request: ScrapingRequest, headers: dict
+    ) -> Tuple[int, Mapping[str, str], str]:
+        """
+        Send the conditional request of a cacheable page to the website
+
+        Args:
+            request (ScrapingRequest): the request to send
+            headers (dict): the conditional headers
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            Tuple[int, Mapping[str, str], str]: the status, headers and body
+        """
+        status, response_headers, body = await self.send(request, headers)
+        if status not in (200, 304):
+            raise requests.exceptions.RequestException("Endpoint is not available")
+        return status, response_headers, body
+
+    async def send(
+        self, request: ScrapingRequest, headers: dict | None = None
+    ) -> Tuple[int, Mapping[str, str], str]:
+        """
+        Send the request to the website, the pages with a tokenizer are
+        downloaded by chunks until the element holding the price is received
+
+        Args:
+            request (ScrapingRequest): the request to send
+            headers (dict | None): headers added to the ones of the request
+
+        Raises:
+            requests.exceptions.RequestException: if the website is unreachable
+
+        Returns:
+            Tuple[int, Mapping[str, str], str]: the status, headers and body
+        """
+        host = urlsplit(request.url).netloc
+        semaphore = self.semaphores.setdefault(
+            host, asyncio.Semaphore(self.host_concurrency)
+        )
+        async with semaphore:
+            try:
+                async with self.session.request(
+                    request.method,
+                    request.url,
+                    data=request.data,
+                    headers=(request.headers or {}) | (headers or {}),
+                ) as response:
+                    if response.status != 200 or not (STREAMING and request.tokenizer):
+                        return response.status, response.headers, await response.text()
+
+                    tokenizer = request.tokenizer()
+                    chunks = response.content.iter_chunked(STREAM_CHUNK_SIZE)
+                    async for chunk in chunks:
+                        if tokenizer.feed_chunk(chunk, response.charset or "utf-8"):
+                            break
+                    # Read the rest of a small page, see STREAM_DRAIN_SIZE
+                    size = 0
+                    async for chunk in chunks:
+                        size += len(chunk)
+                        if size > STREAM_DRAIN_SIZE:
+                            break
+                    return response.status, response.headers, tokenizer.body()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise requests.exceptions.RequestException(str(e)) from e
+
+    async def scrap(
+        self, request: ScrapingRequest, parse: Callable, name: str | None = None
+    ) -> float:
+        """
+        Send the request and parse the kamas price of the response,
+        the cacheable pages are requested conditionally and not parsed
+        again when they did not change
+
+        Args:
+            request (ScrapingRequest): the request to send
+            parse (Callable): the parser of the response
+            name (str | None): the website name, None to send it unguarded
+
+        Raises:
+            requests.exceptions.RequestException: if the endpoint is not available
+
+        Returns:
+            float: the kamas price
+        """
+        if not request.cacheable:
+            return parse(await self.fetch(request, name), request)
+
+        headers = page_cache.conditional_headers(request.url)
+        return parse_response(
+            request,
+            parse,
+            *await self.guarded(name, lambda: self._send_conditional(request, headers)),
+        )
+
+
+async def async_get_kamas_value(
+    name: str, server: str, engine: ScrapingEngine
+) -> float:
+    """
+    Get the kamas value from a website, through the rate limiter
+    and circuit breaker of the website, the requests shared by
+    several servers pass through them once
+
+    Args:
+        name (str): the website name
+        server (str): the server name
+        engine (ScrapingEngine): the engine sending the request
+
+    Returns:
+        float: the kamas value
+    """
+    build_request, parse = WEBSITES_SCRAPERS[name]
+    return await engine.scrap(build_request(server), parse, name)
+
+
+async def async_get_kamas_values(
+    servers: List[str],
+    host_concurrency: int = HOST_CONCURRENCY,
+    deadline: float = SCRAPING_DEADLINE,
+) -> Dict[str, Dict[str, float | None]]:
+    """
+    Get the kamas value of every website for all the servers concurrently,
+    the websites which did not answer before the deadline are ignored
+
+    Args:
+        servers (List[str]): the servers names
+        host_concurrency (int): maximum number of requests in flight per website
+        deadline (float): maximum time in seconds to wait for the websites
+
+    Returns:
+        Dict[str, Dict[str, float | None]]: the kamas value for each website,
+            by server, None if the website was skipped
+    """
+    async with ScrapingEngine(host_concurrency) as engine:
+        keys = [(server, name) for server in servers for name in WEBSITES_SCRAPERS]
+        tasks = [
+            asyncio.create_task(async_get_kamas_value(name, server, engine))
+            for server, name in keys
+        ]
+        _, not_done = await asyncio.wait(tasks, timeout=deadline)
+        pending = not_done | set(engine.pages.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    kamas_values: Dict[str, Dict[str, float | None]] = {
+        server: {} for server in servers
+    }
+    for (server, name), task in zip(keys, tasks):
+        if task in not_done:
+            logging.warning("Deadline exceeded for %s for server %s", name, server)
+        elif isinstance(error := task.exception(), WebsiteSkipped):
+            kamas_values[server][name] = None
+            log_scraping_error(name, server, error)
+        elif error is not None:
+            log_scraping_error(name, server, error)
+        elif (value := task.result()) is not None:
+            kamas_values[server][name] = value
+    return kamas_values
+
+
+def get_kamas_values(
+    servers: List[str],
+    host_concurrency: int = HOST_CONCURRENCY,
+    deadline: float = SCRAPING_DEADLINE,
+) -> Dict[str, Dict[str, float | None]]:
+    """
+    Get the kamas value of every website for all the servers,
+    in a single event loop
+
+    Args:
+        servers (List[str]): the servers names
+        host_concurrency (int): maximum number of requests in flight per website
+        deadline (float): maximum time in seconds to wait for the websites
+
+    Returns:
+        Dict[str, Dict[str, float | None]]: the kamas value for each website,
+            by server, None if the website was skipped
+    """
+    return asyncio.run(async_get_kamas_values(servers, host_concurrency, deadline))
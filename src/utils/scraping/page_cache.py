@@ -0,0 +1,149 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Conditional GET cache of the scraped pages."""
+
+import os
+import time
+from typing import Dict, Mapping
+
+from src.utils.sqlite_store import SqliteStore
+
+# Path of the sqlite file storing the cached pages
+PAGE_CACHE_PATH = os.environ.get("PAGE_CACHE_PATH", "page_cache.sqlite")
+# Maximum number of pages kept in the cache, the least recently used are evicted
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", "256"))
+
+
+class PageCache(SqliteStore):
+    """
+    Store the validators (ETag, Last-Modified) and the extracted price
+    of the scraped pages, to send conditional requests and skip the
+    parsing when the page did not change (304 Not Modified)
+    """
+
+    TABLES = [
+        "CREATE TABLE IF NOT EXISTS pages ("
+        "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+        "price REAL NOT NULL, used_at REAL NOT NULL)"
+    ]
+
+    def __init__(
+        self, path: str = PAGE_CACHE_PATH, max_entries: int = PAGE_CACHE_MAX_ENTRIES
+    ):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Get the headers of a conditional request for the page
+
+        Args:
+            url (str): the page url
+
+        Returns:
+            Dict[str, str]: the conditional headers, empty if the page is not cached
+        """
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT etag, last_modified FROM pages WHERE url = ?", (url,))
+                .fetchone()
+            )
+        headers: Dict[str, str] = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def lookup(self, url: str, status_code: int) -> float | None:
+        """
+        Get the cached price of the page if the website answered it did not change
+
+        Args:
+            url (str): the page url
+            status_code (int): the status code of the conditional request
+
+        Returns:
+            float | None: the cached price, None if the page must be parsed
+        """
+        with self._lock:
+            row = None
+            if status_code == 304:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT price FROM pages WHERE url = ?", (url,)
+                ).fetchone()
+                connection.execute(
+                    "UPDATE pages SET used_at = ? WHERE url = ?", (time.time(), url)
+                )
+                connection.commit()
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def store(self, url: str, headers: Mapping[str, str], price: float) -> None:
+        """
+        Store the validators of the page and its extracted price
+
+        Args:
+            url (str): the page url
+            headers (Mapping[str, str]): the headers of the response
+            price (float): the price extracted from the page
+        """
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, price, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM pages WHERE url NOT IN "
+                "(SELECT url FROM pages ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the statistics of the cache
+
+        Returns:
+            Dict[str, int]: the number of hits, misses and cached pages
+        """
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM pages").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries[0]}
+
+
+page_cache = PageCache()
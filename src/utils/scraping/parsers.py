@@ -0,0 +1,209 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""HTML parser used by the scrapers"""
+
+import codecs
+import importlib.util
+import os
+from html.parser import HTMLParser
+from typing import Iterable, List, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# The C-backed lxml parser is used when installed, html.parser otherwise
+DEFAULT_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+HTML_PARSER = os.environ.get("HTML_PARSER", DEFAULT_PARSER)
+
+
+def strainer(class_name: str, tag: str | None = None) -> SoupStrainer:
+    """
+    Build a strainer keeping only the elements with the class
+    (and their children), so the rest of the page is not turned into a tree
+
+    Args:
+        class_name (str): the class of the elements to keep
+        tag (str | None): the tag of the elements to keep, any tag if None
+
+    Returns:
+        SoupStrainer: the strainer
+    """
+
+    def _match(name: str, attrs: dict) -> bool:
+        return (tag is None or name == tag) and has_class(attrs, class_name)
+
+    return SoupStrainer(_match)
+
+
+def has_class(attrs: dict, class_name: str) -> bool:
+    """
+    Check if the attributes of an element contain the class
+
+    Args:
+        attrs (dict): the attributes of the element
+        class_name (str): the class
+
+    Returns:
+        bool: True if the element has the class
+    """
+    classes = attrs.get("class") or ""
+    if not isinstance(classes, str):
+        classes = " ".join(classes)
+    return class_name in classes.split()
+
+
+def make_soup(
+    body: str, parse_only: SoupStrainer | None = None, parser: str | None = None
+) -> BeautifulSoup:
+    """
+    Parse an html page
+
+    Args:
+        body (str): the html page
+        parse_only (SoupStrainer | None): parse only the matching elements
+        parser (str | None): the parser to use, HTML_PARSER if None
+
+    Returns:
+        BeautifulSoup: the parsed page
+    """
+    return BeautifulSoup(body, parser or HTML_PARSER, parse_only=parse_only)
+
+
+class ElementTokenizer(HTMLParser):
+    """
+    Incremental tokenizer of a page downloaded by chunks, telling when
+    the first element with a class has been entirely received
+    """
+
+    def __init__(self, class_name: str, tag: str | None = None):
+        super().__init__(convert_charrefs=True)
+        self.class_name = class_name
+        self.tag = tag
+        self.done = False
+        self.matched_tag: str | None = None
+        self.depth = 0
+        self._decoder = None
+        self._parts: List[str] = []
+
+    def feed_chunk(self, chunk: bytes, encoding: str) -> bool:
+        """
+        Decode and tokenize a chunk of the page
+
+        Args:
+            chunk (bytes): the chunk
+            encoding (str): the encoding of the page
+
+        Returns:
+            bool: True if the element has been entirely received
+        """
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        text = self._decoder.decode(chunk)
+        self._parts.append(text)
+        self.feed(text)
+        return self.done
+
+    def body(self) -> str:
+        """
+        Get the part of the page received so far
+
+        Returns:
+            str: the received page
+        """
+        return "".join(self._parts)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str]]) -> None:
+        if self.matched_tag == tag:
+            self.depth += 1
+        elif self.matched_tag is None and not self.done:
+            if (self.tag is None or tag == self.tag) and has_class(
+                dict(attrs), self.class_name
+            ):
+                self.matched_tag = tag
+                self.depth = 1
+                self.on_element_start()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.matched_tag == tag:
+            self.depth -= 1
+            if self.depth == 0:
+                self.matched_tag = None
+                self.on_element_end()
+
+    def on_element_start(self) -> None:
+        """
+        Called when a matching element starts
+        """
+
+    def on_element_end(self) -> None:
+        """
+        Called when a matching element ends
+        """
+        self.done = True
+
+
+class ListingTokenizer(ElementTokenizer):
+    """
+    Incremental tokenizer of a listing page, telling when the blocks
+    of all the wanted titles have been entirely received
+    """
+
+    def __init__(
+        self,
+        titles: Iterable[str],
+        block_class: str = "calculate-price",
+        title_class: str = "title",
+    ):
+        super().__init__(block_class)
+        self.missing_titles = set(titles)
+        self.title_class = title_class
+        self.title_depth = 0
+        self.block_titles: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str]]) -> None:
+        super().handle_starttag(tag, attrs)
+        if (
+            self.matched_tag
+            and tag == "div"
+            and not self.title_depth
+            and has_class(dict(attrs), self.title_class)
+        ):
+            self.title_depth = self.depth
+            self.block_titles.append("")
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.title_depth and tag == "div" and self.depth == self.title_depth:
+            self.title_depth = 0
+        super().handle_endtag(tag)
+
+    def handle_data(self, data: str) -> None:
+        if self.title_depth:
+            self.block_titles[-1] += data
+
+    def on_element_start(self) -> None:
+        self.block_titles = []
+        self.title_depth = 0
+
+    def on_element_end(self) -> None:
+        self.missing_titles.difference_update(self.block_titles)
+        self.done = not self.missing_titles
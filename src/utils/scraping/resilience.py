@@ -0,0 +1,196 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Rate limiter and circuit breaker of the scraped websites."""
+
+import contextlib
+import threading
+import time
+from typing import Dict, Iterator
+from urllib.parse import urlsplit
+
+import requests
+
+from src.utils.enums import Website
+
+# Requests per second allowed to each host, and the burst above this rate
+RATE_LIMIT = 2.0
+RATE_BURST = 5
+# Consecutive failures opening the circuit, and seconds before a new attempt
+FAILURE_THRESHOLD = 3
+RECOVERY_TIME = 5 * 60
+
+
+class WebsiteSkipped(Exception):
+    """
+    Raised when a website is not requested because its circuit is open
+    """
+
+
+# pylint: disable=too-few-public-methods
+class TokenBucket:
+    """
+    Token bucket limiting the rate of the requests to a host
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT, capacity: int = RATE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket
+
+        Returns:
+            float: the time in seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a host: opened after consecutive failures,
+    a single probe request is let through after the recovery time
+    (half-open), the circuit is closed if it succeeds and opened again if not
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        recovery_time: float = RECOVERY_TIME,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Returns:
+            bool: True if the host is considered down
+        """
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Check if a request can be sent to the host
+
+        Returns:
+            bool: True if the circuit is closed, or if the request is the probe
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if (
+                not self.probing
+                and time.monotonic() - self.opened_at >= self.recovery_time
+            ):
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """
+        Close the circuit after a successful request
+        """
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self) -> None:
+        """
+        Count a failed request, and open the circuit after too many
+        consecutive failures or when the probe failed
+        """
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """
+        Let another request probe the host, when the probe ended
+        without telling if the host is up (e.g. it was cancelled)
+        """
+        with self._lock:
+            self.probing = False
+
+
+class WebsiteGuard:
+    """
+    Rate limiter and circuit breaker of a website
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket()
+        self.breaker = CircuitBreaker()
+
+    @contextlib.contextmanager
+    def attempt(self) -> Iterator[None]:
+        """
+        Record the result of the request sent in the context,
+        only the endpoint errors count as failures
+        """
+        try:
+            yield
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+
+
+_guards: Dict[str, WebsiteGuard] = {}
+_lock = threading.Lock()
+
+
+def get_website_guard(name: str) -> WebsiteGuard:
+    """
+    Get the guard shared by all the requests to the host of a website
+
+    Args:
+        name (str): the website name
+
+    Returns:
+        WebsiteGuard: the guard of the host
+    """
+    host = urlsplit(Website[name.upper().replace(" ", "_")].value[1]).netloc
+    with _lock:
+        return _guards.setdefault(host, WebsiteGuard())
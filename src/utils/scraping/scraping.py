@@ -23,183 +23,201 @@
 
 """Main module for scraping functions."""
 
+import datetime
 import logging
-from typing import Callable, Dict
+import os
+from enum import Enum
+from typing import Dict, List, Type
 
 import numpy as np
 import requests
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import BaseScheduler
 
-from src.utils.backend import Backend
-from src.utils.enums import ServerClassic, ServerRetro, ServerTouch, Website
-from src.utils.scraping.websites import (
-    get_d_two_gateway_price,
-    get_kamas_from_i_game_gold,
-    get_kamas_from_lekamas,
-    get_kamas_from_try_and_judge,
-    get_kamas_price_from_kamas_facile_endpoint,
-)
+from src.utils.backend import PartialPostError, get_backend, kamas_body
+from src.utils.enums import ServerClassic, ServerRetro, ServerTouch
+from src.utils.history import history
+from src.utils.kamas_values import PUBLISH_LISTENERS
+from src.utils.read_cache import read_cache
+from src.utils.scraping.async_websites import get_kamas_values
+from src.utils.spool import replay_spool, spool
 
+# Interval in minutes between two sweeps of the servers of each game
+SWEEP_INTERVALS: Dict[Type[Enum], int] = {
+    ServerRetro: 29,
+    ServerClassic: 31,
+    ServerTouch: 33,
+}
 
-def schedule_scrapping() -> None:
-    """
-    Schedule the scrapping of the kamas values
-    """
-    scheduler = BackgroundScheduler()
+# Interval in minutes between two attempts to post the spooled kamas values
+REPLAY_INTERVAL = 5
 
-    for server in [server.value for server in ServerRetro.__members__.values()]:
-        scheduler.add_job(
-            get_current_kamas_value,
-            "interval",
-            args=[server],
-            minutes=29,
-        )
+# Interval in minutes of some servers, overriding the interval of their game,
+# e.g. "boune=15,draconiros=20"
+SCRAPING_INTERVALS = os.environ.get("SCRAPING_INTERVALS", "")
 
-    for server in [server.value for server in ServerClassic.__members__.values()]:
-        scheduler.add_job(
-            get_current_kamas_value,
-            "interval",
-            args=[server],
-            minutes=31,
-        )
 
-    for server in [server.value for server in ServerTouch.__members__.values()]:
+def schedule_scrapping(
+    intervals: Dict[str, int] | None = None, scheduler: BaseScheduler | None = None
+) -> None:
+    """
+    Schedule the scrapping of the kamas values, the servers scraped at
+    the same interval are swept together by a single job
+
+    Args:
+        intervals (Dict[str, int] | None): interval in minutes of some servers,
+            overriding the interval of their game
+        scheduler (BaseScheduler | None): the scheduler running the jobs,
+            a background scheduler if None
+    """
+    scheduler = scheduler or BackgroundScheduler()
+
+    for minutes, servers in get_sweeps(intervals or {}).items():
         scheduler.add_job(
-            get_current_kamas_value,
+            sweep_kamas_values,
             "interval",
-            args=[server],
-            minutes=33,
+            args=[servers],
+            minutes=minutes,
         )
+    scheduler.add_job(replay_spool, "interval", minutes=REPLAY_INTERVAL)
 
     print("Start the scheduler")
     scheduler.start()
 
 
-def get_two_last_kamas_value(server: str) -> dict | None:
+def parse_intervals(value: str) -> Dict[str, int]:
     """
-    Get the daily kamas value
+    Parse the interval of some servers, given as comma separated
+    server=minutes pairs
 
     Args:
-        server (str): the server name
+        value (str): the intervals, e.g. "boune=15,draconiros=20"
+
+    Raises:
+        ValueError: if a pair is malformed, its server unknown
+            or its interval not a positive number of minutes
 
     Returns:
-        dict | None: the daily kamas value
+        Dict[str, int]: the interval in minutes, by server name
     """
-    backend = Backend()
-    try:
-        if response := backend.backend_get_two_last_kamas_value(server):
-            return response
-    except requests.exceptions.RequestException as e:
-        logging.error("Error while getting daily kamas value: %s", e)
-    return None
-
-
-def get_yesterday_kamas_value(server: str) -> dict | None:
+    servers = {
+        server.value for enum in SWEEP_INTERVALS for server in enum.__members__.values()
+    }
+    intervals: Dict[str, int] = {}
+    for pair in filter(None, (pair.strip() for pair in value.split(","))):
+        server, _, minutes = pair.partition("=")
+        server = server.strip()
+        if server not in servers:
+            raise ValueError(f"Unknown server in the scraping intervals: {pair}")
+        intervals[server] = int(minutes)
+        if intervals[server] <= 0:
+            raise ValueError(f"Non positive scraping interval: {pair}")
+    return intervals
+
+
+def get_sweeps(intervals: Dict[str, int]) -> Dict[int, List[str]]:
     """
-    Get the yesterday kamas value
+    Group the servers by scraping interval
 
     Args:
-        server (str): the server name
+        intervals (Dict[str, int]): interval in minutes of some servers,
+            overriding the interval of their game
 
     Returns:
-        dict | None: the yesterday kamas value
+        Dict[int, List[str]]: the servers names, by interval in minutes
     """
-    backend = Backend()
-    try:
-        if response := backend.backend_get_yesterday_kamas_value(server):
-            return response
-    except requests.exceptions.RequestException as e:
-        logging.error("Error while getting yesterday kamas value: %s", e)
-
-    return {
-        "timestamp": "1970-01-01T00:00:00.0+00:00",
-        "average": 0,
-        "max": 0,
-        "min": 0,
-        "kamas_dict": {"": 0},
-        "server": server,
-    }
+    sweeps: Dict[int, List[str]] = {}
+    for enum, minutes in SWEEP_INTERVALS.items():
+        for server in [server.value for server in enum.__members__.values()]:
+            sweeps.setdefault(intervals.get(server, minutes), []).append(server)
+    return sweeps
 
 
-def get_scope_kamas_value(server: str, scope: str) -> dict | None:
+def sweep_kamas_values(servers: List[str]) -> None:
     """
-    Get all kamas value
+    Get the current kamas value of several servers in a single sweep,
+    the websites are requested concurrently and their pages shared.
+    The values of all the servers are posted at once
 
     Args:
-        server (str): the server name
-
-    Returns:
-        dict | None: all kamas value
+        servers (List[str]): the servers names
     """
-    backend = Backend()
+    bodies = [
+        body
+        for server, kamas_dict in get_kamas_values(servers).items()
+        if (body := aggregate_kamas_value(server, kamas_dict))
+    ]
+    unposted: List[dict] = []
+    rejected: List[dict] = []
     try:
-        if response := backend.backend_get_scope_kamas_value(server, scope):
-            return response
+        get_backend().backend_post_bulk_kamas_value(bodies)
+    except PartialPostError as e:
+        logging.error("Error while posting daily kamas value: %s", e)
+        unposted, rejected = e.unposted, e.rejected
     except requests.exceptions.RequestException as e:
-        logging.error("Error while getting yesterday kamas value: %s", e)
-
-    return [
-        {
-            "timestamp": "1970-01-01T00:00:00.0+00:00",
-            "average": 0,
-            "max": 0,
-            "min": 0,
-            "kamas_dict": {"None": 0},
-            "server": server,
-        }
-    ]
+        logging.error("Error while posting daily kamas value: %s", e)
+        unposted = bodies
+    if unposted:
+        spool_kamas_values(unposted)
+    kamas_values_published(
+        [body for body in bodies if body not in unposted and body not in rejected]
+    )
 
 
-def get_current_kamas_value(server: str) -> None:
+def kamas_values_published(bodies: List[dict]) -> None:
     """
-    Get the current kamas value
+    Store the published kamas values in the local history, expire the
+    cached values of their servers and notify the publish listeners
+    (e.g. to warm up the server page)
 
     Args:
-        server (str): the server name
+        bodies (List[dict]): the kamas value of each server
     """
-    backend = Backend()
-    kamas_dict: Dict[str, float] = {}
-
-    for name, callback in {
-        Website.D2GATE.value[0]: get_d_two_gateway_price,
-        Website.KAMAS_FACILE.value[0]: get_kamas_price_from_kamas_facile_endpoint,
-        Website.TRY_AND_JUDGE.value[0]: get_kamas_from_try_and_judge,
-        Website.LE_KAMAS.value[0]: get_kamas_from_lekamas,
-        Website.I_GAME_GOLD.value[0]: get_kamas_from_i_game_gold,
-    }.items():
-        get_kamas_value_from_websites_safully(kamas_dict, name, callback, server)
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    history.append([body | {"timestamp": timestamp} for body in bodies])
+    for body in bodies:
+        read_cache.invalidate(body["server"])
+        for listener in PUBLISH_LISTENERS:
+            listener(body["server"])
 
-    if kamas_lst := list(kamas_dict.values()):
-        kamas_lst = [kamas for kamas in kamas_lst if kamas is not None]
-        mean = round(np.mean(kamas_lst), 2)
-        max_ = max(kamas_lst)
-        min_ = min(kamas_lst)
 
-    if mean and max_ and min_:
-        try:
-            backend.backend_post_daily_kamas_value(kamas_dict, mean, max_, min_, server)
-        except requests.exceptions.RequestException as e:
-            logging.error("Error while posting daily kamas value: %s", e)
+def spool_kamas_values(bodies: List[dict]) -> None:
+    """
+    Store the kamas values the backend did not receive, with their
+    timestamp, to post them once the backend is reachable again
 
+    Args:
+        bodies (List[dict]): the kamas value of each server
+    """
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    spool.append([body | {"timestamp": timestamp} for body in bodies])
 
-# pylint: disable=broad-exception-caught
-def get_kamas_value_from_websites_safully(
-    kamas_dict: dict, name: str, callback: Callable, server: str
-) -> None:
+
+def aggregate_kamas_value(
+    server: str, kamas_dict: Dict[str, float | None]
+) -> dict | None:
     """
-    Get the kamas value from websites safully with exception handling
+    Compute the mean, max and min of the kamas value of the websites,
+    the skipped websites (None value) are excluded
 
     Args:
-        kamas_dict (dict): the kamas dict
-        name (str): the website name
-        callback (Callable): the callback function
         server (str): the server name
+        kamas_dict (Dict[str, float | None]): the kamas value for each website
+
+    Returns:
+        dict | None: the body to post, None if there is no value
     """
-    try:
-        kamas_dict[name] = callback(server)
-    except requests.exceptions.RequestException as e:
-        logging.warning("Endpoint error from %s for server %s: %s", name, server, e)
-    except Exception as e:
-        logging.error(
-            "Error while getting kamas value from %s for server %s: %s", name, server, e
-        )
+    if skipped := [name for name, kamas in kamas_dict.items() if kamas is None]:
+        logging.info("Websites excluded for server %s: %s", server, skipped)
+    kamas_dict = {
+        name: kamas for name, kamas in kamas_dict.items() if kamas is not None
+    }
+
+    if kamas_lst := list(kamas_dict.values()):
+        mean = round(np.mean(kamas_lst), 2)
+        max_ = max(kamas_lst)
+        min_ = min(kamas_lst)
+
+        if mean and max_ and min_:
+            return kamas_body(kamas_dict, mean, max_, min_, server)
+    return None
@@ -23,48 +23,282 @@
 
 """Functions to scrap kamas price from differents websites"""
 
+import functools
+import json
+import logging
+import os
 import re
-from typing import List
+from typing import Callable, Dict, Iterator, List, Mapping, Tuple
 
 import requests
-from bs4 import BeautifulSoup
 
-from src.utils.enums import ServerClassic, ServerRetro, ServerTouch
+from src.models.scraping_model import ScrapingRequest
+from src.utils.enums import ServerClassic, ServerRetro, ServerTouch, Website
+from src.utils.scraping.page_cache import page_cache
+from src.utils.scraping.parsers import (
+    ElementTokenizer,
+    ListingTokenizer,
+    make_soup,
+    strainer,
+)
+from src.utils.scraping.resilience import WebsiteSkipped
+from src.utils.sessions import get_session
+
+# Stop the download of the pages once the element holding the price is received
+STREAMING = os.environ.get("SCRAPING_STREAMING", "1") == "1"
+STREAM_CHUNK_SIZE = 16 * 1024
+# A half-read HTTP/1.1 connection can not go back to the pool, it is closed and
+# the next request to the website pays a new TCP and TLS handshake. The rest of
+# the page is read when it is smaller than this size, so the connection is
+# reused, a longer rest is dropped with its connection
+STREAM_DRAIN_SIZE = int(os.environ.get("SCRAPING_DRAIN_SIZE", str(256 * 1024)))
+
+# Only the elements holding the prices are parsed
+PRICE_STRAINER = strainer("current-price-value", "span")
+LISTING_STRAINER = strainer("calculate-price")
+
+
+# Entity id of each server on D2 gateway
+D2GATE_ENTITY_IDS: Dict[str, int] = {
+    ServerRetro.BOUNE.value: 34,
+    ServerRetro.FALLANSTER.value: 104,
+    ServerRetro.ALLISTERIA.value: 103,
+    ServerClassic.DRACONIROS.value: 73,
+    ServerClassic.HELLMINA.value: 74,
+    ServerClassic.IMAGIRO.value: 71,
+    ServerClassic.OMBRE.value: 26,
+    ServerClassic.ORUKAM.value: 72,
+    ServerClassic.TALKASHA.value: 68,
+    ServerClassic.TYLEZIA.value: 75,
+    ServerTouch.BRUTAS.value: 33,
+    ServerTouch.DODGE.value: 28,
+    ServerTouch.GRANDAPAN.value: 32,
+    ServerTouch.HERDEGRIZE.value: 30,
+    ServerTouch.OSHIMO.value: 31,
+    ServerTouch.TERRA_COGITA.value: 29,
+}
+
+
+def price_tokenizer() -> ElementTokenizer:
+    """
+    Build the tokenizer stopping the download after the price element
 
+    Returns:
+        ElementTokenizer: the tokenizer
+    """
+    return ElementTokenizer("current-price-value", "span")
 
-def get_kamas_price_from_kamas_facile_endpoint(server: str) -> float:
+
+def send(
+    request: ScrapingRequest, headers: dict | None = None
+) -> Tuple[int, Mapping[str, str], str]:
     """
-    Get the kamas price from kamas facile endpoint
+    Send the request to the website, the pages with a tokenizer are
+    downloaded by chunks until the element holding the price is received
 
     Args:
-        server (str): the server name
+        request (ScrapingRequest): the request to send
+        headers (dict | None): headers added to the ones of the request
+
+    Returns:
+        Tuple[int, Mapping[str, str], str]: the status, headers and body
+    """
+    with get_session(request.url).request(
+        request.method,
+        request.url,
+        data=request.data,
+        headers=(request.headers or {}) | (headers or {}),
+        timeout=10,
+        stream=True,
+    ) as response:
+        if response.status_code != 200 or not (STREAMING and request.tokenizer):
+            return response.status_code, response.headers, response.text
+
+        tokenizer = request.tokenizer()
+        chunks = response.iter_content(STREAM_CHUNK_SIZE)
+        for chunk in chunks:
+            if tokenizer.feed_chunk(chunk, response.encoding or "utf-8"):
+                break
+        drain(chunks)
+        return response.status_code, response.headers, tokenizer.body()
+
+
+def drain(chunks: Iterator[bytes]) -> None:
+    """
+    Read the rest of a page when it is smaller than STREAM_DRAIN_SIZE,
+    so its keep-alive connection goes back to the pool
+
+    Args:
+        chunks (Iterator[bytes]): the chunks of the page not read yet
+    """
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > STREAM_DRAIN_SIZE:
+            return
+
+
+def fetch(request: ScrapingRequest) -> str:
+    """
+    Send the request to the website
+
+    Args:
+        request (ScrapingRequest): the request to send
 
     Raises:
-        Exception: if the endpoint is not available
+        requests.exceptions.RequestException: if the endpoint is not available
+
+    Returns:
+        str: the body of the response
+    """
+    status, _, body = send(request)
+
+    if status != 200:
+        raise requests.exceptions.RequestException("Endpoint is not available")
+
+    return body
+
+
+def scrap(request: ScrapingRequest, parse: Callable) -> float:
+    """
+    Send the request and parse the kamas price of the response,
+    the cacheable pages are requested conditionally and not parsed
+    again when they did not change
+
+    Args:
+        request (ScrapingRequest): the request to send
+        parse (Callable): the parser of the response
+
+    Raises:
+        requests.exceptions.RequestException: if the endpoint is not available
 
     Returns:
         float: the kamas price
     """
+    if not request.cacheable:
+        return parse(fetch(request), request)
+
+    return parse_response(
+        request, parse, *send(request, page_cache.conditional_headers(request.url))
+    )
+
+
+# pylint: disable=too-many-arguments
+def parse_response(
+    request: ScrapingRequest,
+    parse: Callable,
+    status: int,
+    headers: Mapping[str, str],
+    body: str,
+) -> float:
+    """
+    Parse the kamas price of the response of a conditional request,
+    or get it from the page cache if the page did not change
+
+    Args:
+        request (ScrapingRequest): the sent request
+        parse (Callable): the parser of the response
+        status (int): the status of the response
+        headers (Mapping[str, str]): the headers of the response
+        body (str): the body of the response
+
+    Raises:
+        requests.exceptions.RequestException: if the endpoint is not available
+
+    Returns:
+        float: the kamas price
+    """
+    if (price := page_cache.lookup(request.url, status)) is not None:
+        return price
+
+    if status != 200:
+        raise requests.exceptions.RequestException("Endpoint is not available")
+
+    price = parse(body, request)
+    page_cache.store(request.url, headers, price)
+    return price
+
+
+def log_scraping_error(name: str, server: str, error: Exception) -> None:
+    """
+    Log an error raised while scraping a website
+
+    Args:
+        name (str): the website name
+        server (str): the server name
+        error (Exception): the raised error
+    """
+    if isinstance(error, WebsiteSkipped):
+        logging.info("%s skipped for server %s: %s", name, server, error)
+    elif isinstance(error, requests.exceptions.RequestException):
+        logging.warning("Endpoint error from %s for server %s: %s", name, server, error)
+    else:
+        logging.error(
+            "Error while getting kamas value from %s for server %s: %s",
+            name,
+            server,
+            error,
+        )
+
+
+def kamas_facile_request(server: str) -> ScrapingRequest:
+    """
+    Build the request for kamas facile endpoint
+
+    Args:
+        server (str): the server name
+
+    Returns:
+        ScrapingRequest: the request
+    """
     if server == ServerClassic.OMBRE.value:
         url = f"https://www.kamasfacile.com/fr/{server}-kamas/3m-kamas-{server}shadow"
     else:
         url = f"https://www.kamasfacile.com/fr/{server}/3m-kamas-{server}"
-    response = requests.get(url, timeout=10)
+    return ScrapingRequest(
+        url=url, divided_by=3, cacheable=True, tokenizer=price_tokenizer
+    )
 
-    if response.status_code != 200:
-        raise requests.exceptions.RequestException("Endpoint is not available")
 
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_kamas_facile(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the kamas price from kamas facile page
+
+    Args:
+        body (str): the html page
+        request (ScrapingRequest): the request of the page
+
+    Returns:
+        float: the kamas price
+    """
+    soup = make_soup(body, PRICE_STRAINER)
 
     product_price = soup.find("span", class_="current-price-value")
     product_price = float(product_price.text.replace(",", ".").replace("€", ""))
-    return round(product_price / 3, 2)
+    return round(product_price / request.divided_by, 2)
+
+
+def get_kamas_price_from_kamas_facile_endpoint(server: str) -> float:
+    """
+    Get the kamas price from kamas facile endpoint
+
+    Args:
+        server (str): the server name
+
+    Raises:
+        Exception: if the endpoint is not available
+
+    Returns:
+        float: the kamas price
+    """
+    request = kamas_facile_request(server)
+    return scrap(request, parse_kamas_facile)
 
 
 # pylint: disable=too-many-statements
-def get_kamas_from_lekamas(server: str) -> float:
+def lekamas_request(server: str) -> ScrapingRequest:
     """
-    Get the kamas price from lekamas
+    Build the request for lekamas
 
     Args:
         server (str): the server name
@@ -73,7 +307,7 @@ def get_kamas_from_lekamas(server: str) -> float:
         ValueError: if the server is not found
 
     Returns:
-        float: the kamas price
+        ScrapingRequest: the request
     """
 
     def _setup_payload(arg0: str, server_info, arg2: str, divided_by: int) -> int:
@@ -150,32 +384,63 @@ def get_kamas_from_lekamas(server: str) -> float:
         case _:
             raise ValueError("Server not found")
 
-    url = "https://www.lekamas.fr/index.php?route=journal2/ajax/price"
+    return ScrapingRequest(
+        url="https://www.lekamas.fr/index.php?route=journal2/ajax/price",
+        method="POST",
+        data=payload,
+        headers={
+            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        },
+        divided_by=divided_by,
+    )
 
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-    }
-    response = requests.post(url, headers=headers, data=payload, timeout=10)
 
-    value = response.json()["price"].replace("€", "").replace(",", ".")
-    value = float(value) / divided_by
+def parse_lekamas(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the kamas price from lekamas json response
+
+    Args:
+        body (str): the json response
+        request (ScrapingRequest): the request of the response
+
+    Returns:
+        float: the kamas price
+    """
+    value = json.loads(body)["price"].replace("€", "").replace(",", ".")
+    value = float(value) / request.divided_by
     return round(value, 2)
 
 
-def get_kamas_price_from_mode_marchand(server: str) -> float:
+def get_kamas_from_lekamas(server: str) -> float:
     """
-    Get the kamas price from mode marchand
+    Get the kamas price from lekamas
 
     Args:
         server (str): the server name
 
     Raises:
-        Exception: if the endpoint is not available
-        Exception: if the server is not found
+        ValueError: if the server is not found
 
     Returns:
         float: the kamas price
     """
+    request = lekamas_request(server)
+    return scrap(request, parse_lekamas)
+
+
+def mode_marchand_request(server: str) -> ScrapingRequest:
+    """
+    Build the request for mode marchand
+
+    Args:
+        server (str): the server name
+
+    Raises:
+        ValueError: if the server is not found
+
+    Returns:
+        ScrapingRequest: the request
+    """
     endpoint_retro = "https://www.mode-marchand.net/annonces/dofus-retro/kamas"
     endpoint_classique = "https://www.mode-marchand.net/annonces/dofus/kamas"
     endpoint_touch = "https://www.mode-marchand.net/annonces/dofus-touch/kamas"
@@ -212,12 +477,22 @@ def get_kamas_price_from_mode_marchand(server: str) -> float:
         case _:
             raise ValueError("Server not found")
 
-    response = requests.get(url, timeout=10)
+    return ScrapingRequest(url=url)
 
-    if response.status_code != 200:
-        raise requests.exceptions.RequestException("Endpoint is not available")
 
-    soup = BeautifulSoup(response.text, "html.parser")
+# pylint: disable=unused-argument
+def parse_mode_marchand(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the kamas price from mode marchand page
+
+    Args:
+        body (str): the html page
+        request (ScrapingRequest): the request of the page
+
+    Returns:
+        float: the kamas price
+    """
+    soup = make_soup(body, strainer("card-footer", "div"))
     product_prices = soup.find_all("div", class_="card-footer")
 
     prices: List[float] = []
@@ -233,9 +508,9 @@ def get_kamas_price_from_mode_marchand(server: str) -> float:
     return min(prices)
 
 
-def get_kamas_from_try_and_judge(server: str) -> float:
+def get_kamas_price_from_mode_marchand(server: str) -> float:
     """
-    Get the kamas price from try and judge
+    Get the kamas price from mode marchand
 
     Args:
         server (str): the server name
@@ -247,6 +522,23 @@ def get_kamas_from_try_and_judge(server: str) -> float:
     Returns:
         float: the kamas price
     """
+    request = mode_marchand_request(server)
+    return scrap(request, parse_mode_marchand)
+
+
+def try_and_judge_request(server: str) -> ScrapingRequest:
+    """
+    Build the request for try and judge
+
+    Args:
+        server (str): the server name
+
+    Raises:
+        ValueError: if the server is not found
+
+    Returns:
+        ScrapingRequest: the request
+    """
     endpoint_retro = "https://www.tryandjudge.com/fr/retro-kamas"
     endpoint_classique = "https://www.tryandjudge.com/fr/dofus-kamas"
     endpoint_touch = "https://www.tryandjudge.com/fr/dofus-touch"
@@ -300,93 +592,120 @@ def get_kamas_from_try_and_judge(server: str) -> float:
         case _:
             raise ValueError("Server not found")
 
-    response = requests.get(url, timeout=10)
+    return ScrapingRequest(
+        url=url, divided_by=divided_by, cacheable=True, tokenizer=price_tokenizer
+    )
 
-    if response.status_code != 200:
-        raise requests.exceptions.RequestException("Endpoint is not available")
 
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_try_and_judge(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the kamas price from try and judge page
+
+    Args:
+        body (str): the html page
+        request (ScrapingRequest): the request of the page
+
+    Returns:
+        float: the kamas price
+    """
+    soup = make_soup(body, PRICE_STRAINER)
     product_prices = soup.find("span", class_="current-price-value")
     kamas_value = product_prices.text
 
     price = float(kamas_value.replace("€", "").replace(",", "."))
-    return round(price / divided_by, 2)
+    return round(price / request.divided_by, 2)
 
 
-def get_d_two_gateway_price(server: str) -> float:
+def get_kamas_from_try_and_judge(server: str) -> float:
     """
-    Get the kamas price from D2 gateway
+    Get the kamas price from try and judge
 
     Args:
         server (str): the server name
 
     Raises:
         Exception: if the endpoint is not available
+        Exception: if the server is not found
 
     Returns:
         float: the kamas price
     """
+    request = try_and_judge_request(server)
+    return scrap(request, parse_try_and_judge)
+
+
+def d_two_gateway_request(server: str) -> ScrapingRequest:
+    """
+    Build the request for D2 gateway
+
+    Args:
+        server (str): the server name
+
+    Raises:
+        ValueError: if the server is not found
+
+    Returns:
+        ScrapingRequest: the request
+    """
+    if server not in D2GATE_ENTITY_IDS:
+        raise ValueError("Server not found")
+
     endpoint = "https://fr.d2gate.net/api/offers"
     start_query = "?finalEntityId="
     end_query = (
         "&initialEntityIds=55%2C54%2C6%2C9%2C4%2C3%2C7%2C69%2C47%2C5%2C57%2C8%2C70"
         + "&max=1&min=1&onlyConnected=1&order=price"
     )
-    match server:
-        case ServerRetro.BOUNE.value:
-            url = f"{endpoint}{start_query}34{end_query}"
-        case ServerRetro.FALLANSTER.value:
-            url = f"{endpoint}{start_query}104{end_query}"
-        case ServerRetro.ALLISTERIA.value:
-            url = f"{endpoint}{start_query}103{end_query}"
-        case ServerClassic.DRACONIROS.value:
-            url = f"{endpoint}{start_query}73{end_query}"
-        case ServerClassic.HELLMINA.value:
-            url = f"{endpoint}{start_query}74{end_query}"
-        case ServerClassic.IMAGIRO.value:
-            url = f"{endpoint}{start_query}71{end_query}"
-        case ServerClassic.OMBRE.value:
-            url = f"{endpoint}{start_query}26{end_query}"
-        case ServerClassic.ORUKAM.value:
-            url = f"{endpoint}{start_query}72{end_query}"
-        case ServerClassic.TALKASHA.value:
-            url = f"{endpoint}{start_query}68{end_query}"
-        case ServerClassic.TYLEZIA.value:
-            url = f"{endpoint}{start_query}75{end_query}"
-        case ServerTouch.BRUTAS.value:
-            url = f"{endpoint}{start_query}33{end_query}"
-        case ServerTouch.DODGE.value:
-            url = f"{endpoint}{start_query}28{end_query}"
-        case ServerTouch.GRANDAPAN.value:
-            url = f"{endpoint}{start_query}32{end_query}"
-        case ServerTouch.HERDEGRIZE.value:
-            url = f"{endpoint}{start_query}30{end_query}"
-        case ServerTouch.OSHIMO.value:
-            url = f"{endpoint}{start_query}31{end_query}"
-        case ServerTouch.TERRA_COGITA.value:
-            url = f"{endpoint}{start_query}29{end_query}"
-        case _:
-            raise ValueError("Server not found")
-    response = requests.get(url, timeout=10)
+    return ScrapingRequest(
+        url=f"{endpoint}{start_query}{D2GATE_ENTITY_IDS[server]}{end_query}"
+    )
 
-    if response.status_code != 200:
-        raise requests.exceptions.RequestException("Endpoint is not available")
 
-    response = response.json()
+# pylint: disable=unused-argument
+def parse_d_two_gateway(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the kamas price from D2 gateway json response
 
-    return float(response["result"][0]["price"])
+    Args:
+        body (str): the json response
+        request (ScrapingRequest): the request of the response
+
+    Returns:
+        float: the kamas price
+    """
+    return float(json.loads(body)["result"][0]["price"])
+
+
+def get_d_two_gateway_price(server: str) -> float:
+    """
+    Get the kamas price from D2 gateway
+
+    Args:
+        server (str): the server name
+
+    Raises:
+        Exception: if the endpoint is not available
+
+    Returns:
+        float: the kamas price
+    """
+    request = d_two_gateway_request(server)
+    return scrap(request, parse_d_two_gateway)
 
 
 # pylint: disable=too-many-statements
-def get_kamas_from_i_game_gold(server: str) -> float:
+def i_game_gold_offer(server: str) -> Tuple[str, int, str]:
     """
-    Get the price of 1M of kamas from iGameGold
+    Get the listing page and the offer of a server on iGameGold
 
     Args:
         server (str): The server name
 
+    Raises:
+        ValueError: if the server is not found
+
     Returns:
-        float: The price of 1M of kamas
+        Tuple[str, int, str]: the listing page url, the divisor and the offer title
     """
     url = "https://www.igamegold.com/fr/Dofus-Kamas"
     match server:
@@ -447,17 +766,133 @@ def get_kamas_from_i_game_gold(server: str) -> float:
         case _:
             raise ValueError("Server not found")
 
-    response = requests.get(url, timeout=10)
+    return url, divided_by, string
 
-    if response.status_code != 200:
-        raise requests.exceptions.RequestException("Endpoint is not available")
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    calculate_price_elements = soup.find_all(class_="calculate-price")
+@functools.lru_cache
+def i_game_gold_titles(url: str) -> Tuple[str, ...]:
+    """
+    Get the offer titles of all the servers listed on an iGameGold page
+
+    Args:
+        url (str): the listing page url
+
+    Returns:
+        Tuple[str, ...]: the offer titles
+    """
+    titles = []
+    for enum in (ServerRetro, ServerClassic, ServerTouch):
+        for server in enum:
+            server_url, _, title = i_game_gold_offer(server.value)
+            if server_url == url:
+                titles.append(title)
+    return tuple(titles)
+
+
+def i_game_gold_request(server: str) -> ScrapingRequest:
+    """
+    Build the request for iGameGold, the download of the listing page
+    stops once the offers of all its servers are received
+
+    Args:
+        server (str): The server name
+
+    Raises:
+        ValueError: if the server is not found
+
+    Returns:
+        ScrapingRequest: the request
+    """
+    url, divided_by, title = i_game_gold_offer(server)
+    return ScrapingRequest(
+        url=url,
+        divided_by=divided_by,
+        title=title,
+        tokenizer=functools.partial(ListingTokenizer, i_game_gold_titles(url)),
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def parse_i_game_gold_index(body: str) -> Dict[str, float]:
+    """
+    Parse all the prices of an iGameGold listing page, indexed by title.
+    The result is cached, so a page shared by several servers is parsed once
+
+    Args:
+        body (str): the html page
+
+    Returns:
+        Dict[str, float]: the price of each offer, by offer title
+    """
+    soup = make_soup(body, LISTING_STRAINER)
+    index: Dict[str, float] = {}
+
+    for element in soup.find_all(class_="calculate-price"):
+        if price_span := element.find("span", class_="price-value"):
+            for title in element.find_all("div", class_="title"):
+                if title.string is not None:
+                    index.setdefault(str(title.string), float(price_span.text))
+
+    return index
+
+
+def get_price_from_i_game_gold_index(
+    index: Dict[str, float], request: ScrapingRequest
+) -> float:
+    """
+    Get the price of 1M of kamas from an iGameGold listing index
+
+    Args:
+        index (Dict[str, float]): the price of each offer, by offer title
+        request (ScrapingRequest): the request of the server
+
+    Raises:
+        ValueError: if the server is not found in the index
+
+    Returns:
+        float: The price of 1M of kamas
+    """
+    if request.title not in index:
+        raise ValueError("Server not found")
+    return round(index[request.title] / request.divided_by, 2)
 
-    for element in calculate_price_elements:
-        if element.find("div", class_="title", string=string):
-            if price_span := element.find("span", class_="price-value"):
-                return round(float(price_span.text) / divided_by, 2)
 
-    raise ValueError("Server not found")
+def parse_i_game_gold(body: str, request: ScrapingRequest) -> float:
+    """
+    Parse the price of 1M of kamas from iGameGold page
+
+    Args:
+        body (str): the html page
+        request (ScrapingRequest): the request of the page
+
+    Raises:
+        ValueError: if the server is not found in the page
+
+    Returns:
+        float: The price of 1M of kamas
+    """
+    return get_price_from_i_game_gold_index(parse_i_game_gold_index(body), request)
+
+
+def get_kamas_from_i_game_gold(server: str) -> float:
+    """
+    Get the price of 1M of kamas from iGameGold
+
+    Args:
+        server (str): The server name
+
+    Returns:
+        float: The price of 1M of kamas
+    """
+    request = i_game_gold_request(server)
+    return scrap(request, parse_i_game_gold)
+
+
+# Request builder and parser of each scraped website
+WEBSITES_SCRAPERS: Dict[str, Tuple[Callable, Callable]] = {
+    Website.D2GATE.value[0]: (d_two_gateway_request, parse_d_two_gateway),
+    Website.KAMAS_FACILE.value[0]: (kamas_facile_request, parse_kamas_facile),
+    Website.TRY_AND_JUDGE.value[0]: (try_and_judge_request, parse_try_and_judge),
+    Website.LE_KAMAS.value[0]: (lekamas_request, parse_lekamas),
+    Website.I_GAME_GOLD.value[0]: (i_game_gold_request, parse_i_game_gold),
+}
@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Module for the shared HTTP sessions."""
+
+import os
+import threading
+from typing import Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Maximum number of keep-alive connections kept open per host
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+
+_sessions: Dict[str, requests.Session] = {}
+_pool_sizes: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def set_pool_size(url: str, pool_maxsize: int) -> None:
+    """
+    Set the size of the connection pool of a host,
+    must be called before the first request to this host
+
+    Args:
+        url (str): an url of the host
+        pool_maxsize (int): maximum number of connections kept open
+    """
+    _pool_sizes[_get_host(url)] = pool_maxsize
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Get the shared session of the host of the url,
+    the connections of the session are kept alive between requests
+
+    Args:
+        url (str): the url to request
+
+    Returns:
+        requests.Session: the session of the host
+    """
+    host = _get_host(url)
+    with _lock:
+        if host not in _sessions:
+            pool_maxsize = _pool_sizes.get(host, POOL_MAXSIZE)
+            session = requests.Session()
+            session.mount(
+                host,
+                HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize),
+            )
+            _sessions[host] = session
+        return _sessions[host]
+
+
+def close_sessions() -> None:
+    """
+    Close all the shared sessions and their connections
+    """
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _get_host(url: str) -> str:
+    """
+    Get the scheme and the host of an url
+
+    Args:
+        url (str): the url
+
+    Returns:
+        str: the scheme and the host, e.g. https://fr.d2gate.net
+    """
+    split_url = urlsplit(url)
+    return f"{split_url.scheme}://{split_url.netloc}"
@@ -0,0 +1,212 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Durable spool of the kamas values the backend could not receive."""
+
+import json
+import logging
+import os
+import threading
+from typing import List, Set, Tuple
+
+import requests
+
+from src.utils.backend import Backend, PartialPostError, get_backend
+
+# Path of the append-only spool file, one json body per line
+SPOOL_PATH = os.environ.get("SPOOL_PATH", "kamas_spool.jsonl")
+# Maximum size of the spool file in bytes, the oldest values are dropped above
+SPOOL_MAX_BYTES = int(os.environ.get("SPOOL_MAX_BYTES", str(10_000_000)))
+# Number of values posted per request when the spool is replayed
+REPLAY_BATCH_SIZE = 50
+
+
+class Spool:
+    """
+    Append-only file of the kamas values which could not be posted,
+    replayed in batches once the backend is reachable again.
+    The values are deduplicated by (server, timestamp)
+    """
+
+    def __init__(self, path: str = SPOOL_PATH, max_bytes: int = SPOOL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def append(self, bodies: List[dict]) -> None:
+        """
+        Store the values, they must have a timestamp
+
+        Args:
+            bodies (List[dict]): the kamas value of each server
+        """
+        with self._lock:
+            entries = self._read()
+            keys = {_key(entry) for entry in entries}
+            new_entries = []
+            for body in bodies:
+                if _key(body) not in keys:
+                    keys.add(_key(body))
+                    new_entries.append(body)
+
+            with open(self.path, "a", encoding="utf-8") as file:
+                for entry in new_entries:
+                    file.write(json.dumps(entry) + "\n")
+
+            if os.path.getsize(self.path) > self.max_bytes:
+                self._write(entries + new_entries)
+
+    def replay(self, backend: Backend, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+        """
+        Post the stored values in batches, and remove the posted ones.
+        The values refused by the backend are moved to the quarantine file,
+        so they do not hold back the next ones
+
+        Args:
+            backend (Backend): the backend
+            batch_size (int): number of values posted per request
+
+        Raises:
+            requests.exceptions.RequestException: if the backend is not available
+
+        Returns:
+            int: the number of posted values
+        """
+        with self._lock:
+            entries = self._read()
+
+        posted: Set[Tuple[str, str]] = set()
+        rejected: List[dict] = []
+        try:
+            for index in range(0, len(entries), batch_size):
+                batch = entries[index : index + batch_size]
+                try:
+                    backend.backend_post_bulk_kamas_value(batch)
+                except PartialPostError as e:
+                    rejected.extend(e.rejected)
+                    unposted = {_key(entry) for entry in e.unposted + e.rejected}
+                    posted.update(
+                        _key(entry) for entry in batch if _key(entry) not in unposted
+                    )
+                    if e.unposted:
+                        raise
+                    continue
+                posted.update(_key(entry) for entry in batch)
+        finally:
+            if rejected:
+                logging.error("%s spooled kamas values refused", len(rejected))
+                self._quarantine(rejected)
+            removed = posted | {_key(entry) for entry in rejected}
+            if removed:
+                with self._lock:
+                    self._write(
+                        [entry for entry in self._read() if _key(entry) not in removed]
+                    )
+        return len(posted)
+
+    @property
+    def quarantine_path(self) -> str:
+        """
+        Path of the file keeping the values refused by the backend
+        """
+        return f"{self.path}.rejected"
+
+    def _quarantine(self, entries: List[dict]) -> None:
+        """
+        Keep the values refused by the backend apart, to be looked at
+
+        Args:
+            entries (List[dict]): the refused values
+        """
+        with self._lock, open(self.quarantine_path, "a", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._read())
+
+    def _read(self) -> List[dict]:
+        """
+        Read the stored values, the corrupted lines are ignored
+
+        Returns:
+            List[dict]: the stored values, the oldest first
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def _write(self, entries: List[dict]) -> None:
+        """
+        Replace the stored values, dropping the oldest ones above the size limit
+
+        Args:
+            entries (List[dict]): the values to store, the oldest first
+        """
+        lines = [json.dumps(entry) + "\n" for entry in entries]
+        size = sum(len(line.encode()) for line in lines)
+        while lines and size > self.max_bytes:
+            size -= len(lines.pop(0).encode())
+
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.writelines(lines)
+        os.replace(temporary_path, self.path)
+
+
+def _key(entry: dict) -> Tuple[str, str]:
+    """
+    Get the deduplication key of a value
+
+    Args:
+        entry (dict): the kamas value of a server
+
+    Returns:
+        Tuple[str, str]: the server and the timestamp
+    """
+    return entry["server"], entry["timestamp"]
+
+
+spool = Spool()
+
+
+def replay_spool() -> None:
+    """
+    Post the values stored while the backend was not reachable
+    """
+    if not os.path.exists(spool.path) or not os.path.getsize(spool.path):
+        return
+    try:
+        if posted := spool.replay(get_backend()):
+            logging.info("%s spooled kamas values posted", posted)
+    except requests.exceptions.RequestException as e:
+        logging.warning("Backend still not available to replay the spool: %s", e)
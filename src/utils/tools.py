@@ -27,6 +27,7 @@ import datetime
 import logging
 from logging.handlers import RotatingFileHandler
 
+import numpy as np
 import pytz
 import tzlocal
 
@@ -65,3 +66,51 @@ def logger_config(level: int = logging.INFO) -> None:
         handler.setLevel(level)
         handler.setFormatter(formatter)
         logger.addHandler(handler)
+
+
+def to_time(timestamp: str) -> float:
+    """
+    Convert an ISO 8601 timestamp to a POSIX time, UTC if it has no offset
+
+    Args:
+        timestamp (str): the timestamp
+
+    Returns:
+        float: the POSIX time
+    """
+    date = datetime.datetime.fromisoformat(timestamp)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.timestamp()
+
+
+def parse_timestamps(timestamps: np.ndarray | list) -> np.ndarray:
+    """
+    Convert ISO 8601 timestamps to UTC dates, whatever their number of
+    fraction digits, UTC if they have no offset. The offsets are split off
+    and the dates are parsed in a single vectorized pass by numpy
+
+    Args:
+        timestamps (np.ndarray | list): the timestamps
+
+    Returns:
+        np.ndarray: the datetime64 UTC dates
+    """
+    values = np.asarray(timestamps, dtype=str).tolist()
+    offsets = [
+        value[-6:] if value[-6:-5] in ("+", "-") and value[-3:-2] == ":" else ""
+        for value in values
+    ]
+    minutes = {
+        offset: int(f"{offset[0]}1") * (int(offset[1:3]) * 60 + int(offset[4:]))
+        for offset in set(offsets)
+        if offset
+    } | {"": 0}
+    dates = np.array(
+        [
+            value[: len(value) - len(offset)].removesuffix("Z")
+            for value, offset in zip(values, offsets)
+        ],
+        dtype="datetime64[us]",
+    )
+    return dates - np.array([minutes[offset] for offset in offsets], "timedelta64[m]")
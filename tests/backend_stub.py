@@ -0,0 +1,166 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Local stand-in of the backend for the tests."""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+
+from src.models.kamas_model import KamasColumns
+from src.utils.backend import COLUMNS_MEDIA_TYPE, Backend
+from src.utils.tools import to_time
+
+
+class StubBackend:
+    """
+    Backend answering on a local port, recording the posted kamas values.
+    The answers are compressed with gzip when it is accepted, and the scope
+    values are sent by column when the client accepts it, only after the
+    timestamp of the after parameter
+    """
+
+    def __init__(
+        self,
+        bulk_supported: bool = True,
+        columns_supported: bool = True,
+        delta_supported: bool = True,
+    ):
+        self.bulk_supported = bulk_supported
+        self.columns_supported = columns_supported
+        self.delta_supported = delta_supported
+        self.posts: List[dict] = []
+        # Servers whose single posts are answered with a server error
+        self.failing_servers: List[str] = []
+        # Servers whose posts are refused with a client error
+        self.rejected_servers: List[str] = []
+        self.requests: List[str] = []
+        # (path, content encoding, content type, bytes sent) of each answer
+        self.answers: List[tuple] = []
+        self.values: List[dict] = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.port = self.server.server_address[1]
+
+    def __enter__(self) -> "StubBackend":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self) -> Backend:
+        """
+        Get a backend client sending its requests to this stand-in
+
+        Returns:
+            Backend: the backend client
+        """
+        backend = Backend()
+        backend.host, backend.port = "127.0.0.1", self.port
+        return backend
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Handler of the stand-in backend
+            """
+
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                stub.requests.append(f"GET {self.path}")
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                server = query.get("server", [""])[0]
+                values = [value for value in stub.values if value["server"] == server]
+                if stub.delta_supported and "after" in query:
+                    after = to_time(query["after"][0])
+                    values = [
+                        value for value in values if to_time(value["timestamp"]) > after
+                    ]
+                match url.path:
+                    case "/today":
+                        self._answer(200, values[-2:][::-1])
+                    case "/yesterday":
+                        self._answer(200, values[0] if values else {})
+                    case "/kamas" if self._accepts_columns():
+                        columns = KamasColumns.from_rows(values, server)
+                        self._answer(200, columns.to_columns(), COLUMNS_MEDIA_TYPE)
+                    case "/kamas":
+                        self._answer(200, values)
+                    case _:
+                        self._answer(404, {})
+
+            def _accepts_columns(self) -> bool:
+                accept = self.headers.get("Accept", "")
+                return stub.columns_supported and COLUMNS_MEDIA_TYPE in accept
+
+            def do_POST(self) -> None:
+                stub.requests.append(f"POST {self.path}")
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                match self.path:
+                    case "/kamas" if body["server"] in stub.failing_servers:
+                        self._answer(500, {})
+                    case "/kamas" if body["server"] in stub.rejected_servers:
+                        self._answer(422, {})
+                    case "/kamas":
+                        stub.posts.append(body)
+                        self._answer(200, {})
+                    case "/kamas/bulk" if stub.bulk_supported and any(
+                        value["server"] in stub.rejected_servers for value in body
+                    ):
+                        self._answer(422, {})
+                    case "/kamas/bulk" if stub.bulk_supported:
+                        stub.posts.extend(body)
+                        self._answer(200, {})
+                    case _:
+                        self._answer(404, {})
+
+            def _answer(
+                self, status: int, body, content_type: str = "application/json"
+            ) -> None:
+                content = json.dumps(body).encode()
+                accept_encoding = self.headers.get("Accept-Encoding", "")
+                encoding = ""
+                if "gzip" in accept_encoding:
+                    content, encoding = gzip.compress(content), "gzip"
+                stub.answers.append((self.path, encoding, content_type, len(content)))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,195 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Backend test module."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from src.utils.backend import (
+    COLUMNS_MEDIA_TYPE,
+    PartialPostError,
+    SingleFlight,
+    kamas_body,
+)
+from tests.backend_stub import StubBackend
+
+BODIES = [
+    kamas_body({"D2gate": 1.0, "Le kamas": 3.0}, 2.0, 3.0, 1.0, "boune"),
+    kamas_body({"D2gate": 4.0}, 4.0, 4.0, 4.0, "dodge"),
+]
+
+
+def test_bulk_post():
+    with StubBackend() as stub:
+        stub.client().backend_post_bulk_kamas_value(BODIES)
+
+    assert stub.requests == ["POST /kamas/bulk"]
+    assert stub.posts == BODIES
+
+
+def test_bulk_post_fallback():
+    with StubBackend(bulk_supported=False) as stub:
+        backend = stub.client()
+        backend.backend_post_bulk_kamas_value(BODIES)
+        backend.backend_post_bulk_kamas_value(BODIES[:1])
+
+    assert stub.requests == ["POST /kamas/bulk"] + ["POST /kamas"] * 3
+    assert stub.posts == BODIES + BODIES[:1]
+
+
+def test_bulk_post_fallback_partial():
+    with StubBackend(bulk_supported=False) as stub:
+        stub.failing_servers = ["dodge"]
+        with pytest.raises(PartialPostError) as error:
+            stub.client().backend_post_bulk_kamas_value(BODIES + BODIES[:1])
+
+    assert stub.posts == BODIES[:1]
+    assert error.value.unposted == BODIES[1:] + BODIES[:1]
+
+
+@pytest.mark.parametrize("bulk_supported", [True, False])
+def test_bulk_post_rejected(bulk_supported):
+    with StubBackend(bulk_supported=bulk_supported) as stub:
+        stub.rejected_servers = ["boune"]
+        backend = stub.client()
+        with pytest.raises(PartialPostError) as error:
+            backend.backend_post_bulk_kamas_value(BODIES)
+
+    assert stub.posts == BODIES[1:]
+    assert error.value.unposted == []
+    assert error.value.rejected == BODIES[:1]
+    assert backend.bulk_supported == bulk_supported
+
+
+def test_scope_columns():
+    with StubBackend() as stub:
+        stub.values = [body | {"timestamp": "2024-01-01T00:00:00"} for body in BODIES]
+        columns = stub.client().backend_get_scope_kamas_columns("boune", "day")
+
+    assert stub.answers[0][1] == "gzip"
+    assert stub.answers[0][2] == COLUMNS_MEDIA_TYPE
+    assert columns.timestamps.tolist() == ["2024-01-01T00:00:00"]
+    assert columns.average.tolist() == [2.0]
+    assert columns.sites == ["D2gate", "Le kamas"]
+    assert columns.prices.tolist() == [[1.0], [3.0]]
+
+
+def test_scope_columns_fallback():
+    with StubBackend(columns_supported=False) as stub:
+        stub.values = [
+            BODIES[0] | {"timestamp": "2024-01-01T00:00:00"},
+            kamas_body({"D2gate": 2.0}, 2.0, 2.0, 2.0, "boune")
+            | {"timestamp": "2024-01-01T00:30:00"},
+        ]
+        columns = stub.client().backend_get_scope_kamas_columns("boune", "day")
+
+    assert stub.answers[0][1] == "gzip"
+    assert stub.answers[0][2] == "application/json"
+    assert columns.min.tolist() == [1.0, 2.0]
+    np.testing.assert_array_equal(columns.prices, [[1.0, 2.0], [3.0, np.nan]])
+
+
+def test_scope_columns_after():
+    with StubBackend() as stub:
+        stub.values = [
+            body | {"timestamp": f"2024-01-01T0{hour}:00:00"}
+            for hour, body in enumerate(BODIES[:1] * 3)
+        ]
+        backend = stub.client()
+        columns = backend.backend_get_scope_kamas_columns_after(
+            "boune", "year", "2024-01-01T00:00:00"
+        )
+
+    assert columns.timestamps.tolist() == [
+        "2024-01-01T01:00:00",
+        "2024-01-01T02:00:00",
+    ]
+    assert backend.delta_supported
+
+
+def test_scope_columns_after_fallback():
+    with StubBackend(delta_supported=False) as stub:
+        stub.values = [
+            body | {"timestamp": f"2024-01-01T0{hour}:00:00"}
+            for hour, body in enumerate(BODIES[:1] * 3)
+        ]
+        backend = stub.client()
+        columns = backend.backend_get_scope_kamas_columns_after(
+            "boune", "year", "2024-01-01T01:00:00"
+        )
+
+    assert columns.timestamps.tolist() == ["2024-01-01T02:00:00"]
+    assert not backend.delta_supported
+
+
+def _concurrent_calls(single_flight: SingleFlight, call, count: int = 8) -> list:
+    results: list = [None] * count
+
+    def caller(index: int) -> None:
+        try:
+            results[index] = single_flight.do("key", call)
+        except ValueError as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_coalesces_calls():
+    single_flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def call() -> int:
+        calls.append(1)
+        release.wait(5)
+        return 42
+
+    threading.Timer(0.2, release.set).start()
+    assert _concurrent_calls(single_flight, call) == [42] * 8
+    assert len(calls) == 1
+    assert single_flight.do("key", lambda: 43) == 43
+
+
+def test_single_flight_propagates_error():
+    single_flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+    error = ValueError("backend down")
+
+    def call() -> int:
+        calls.append(1)
+        release.wait(5)
+        raise error
+
+    threading.Timer(0.2, release.set).start()
+    assert _concurrent_calls(single_flight, call) == [error] * 8
+    assert len(calls) == 1
+    assert single_flight.do("key", lambda: 43) == 43
@@ -0,0 +1,64 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Graphs test module."""
+
+import numpy as np
+
+from src.utils.graphs import min_max_downsample
+
+
+def test_downsample_unchanged_when_it_fits():
+    x_values = np.arange(40)
+    series = [np.sin(x_values), np.cos(x_values)]
+
+    np.testing.assert_array_equal(
+        min_max_downsample(x_values, series, 10), np.arange(40)
+    )
+
+
+def test_downsample_keeps_peaks_and_troughs():
+    x_values = np.arange(10_000)
+    values = np.zeros(10_000)
+    values[1234], values[5678] = 100.0, -100.0
+
+    indices = min_max_downsample(x_values, [values], 50)
+
+    assert len(indices) <= 2 * 50 + 2
+    assert {0, 1234, 5678, 9999} <= set(indices.tolist())
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_downsample_dates():
+    x_values = np.arange(
+        "2024-01-01", "2024-02-01", np.timedelta64(10, "m"), dtype="datetime64[us]"
+    )
+    average = np.ones(len(x_values))
+    minimum = np.ones(len(x_values))
+    average[100] = 5.0
+    minimum[200] = -5.0
+
+    indices = min_max_downsample(x_values, [average, minimum], 20)
+
+    assert len(indices) <= 2 * 2 * 20 + 2
+    assert {0, 100, 200, len(x_values) - 1} <= set(indices.tolist())
@@ -0,0 +1,101 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Local history test module."""
+
+import datetime
+
+import pytest
+
+from src.utils import history as history_module
+from src.utils import kamas_values
+from src.utils.backend import kamas_body
+from src.utils.history import KamasHistory
+from src.utils.tools import to_time
+from tests.backend_stub import StubBackend
+
+
+def _timestamp(hours: float) -> str:
+    date = datetime.datetime.now(datetime.timezone.utc)
+    return (date - datetime.timedelta(hours=hours)).isoformat()
+
+
+def _value(average: float, hours: float) -> dict:
+    body = kamas_body({"D2gate": average}, average, average, average, "boune")
+    return body | {"timestamp": _timestamp(hours)}
+
+
+@pytest.fixture(name="history")
+def fixture_history(tmp_path, monkeypatch):
+    local_history = KamasHistory(str(tmp_path / "history.sqlite"))
+    monkeypatch.setattr(kamas_values, "history", local_history)
+    return local_history
+
+
+def _averages(history: KamasHistory) -> list:
+    return history.query("boune", history_module.scope_start("year")).average.tolist()
+
+
+def test_delta_pull(history):
+    with StubBackend() as stub:
+        stub.values = [_value(average, 10 - average) for average in (1, 2, 3)]
+        backend = stub.client()
+        kamas_values.pull_scope_kamas_value(backend, "boune", "year", 0)
+        stub.values.append(_value(4, 1))
+        kamas_values.pull_scope_kamas_value(backend, "boune", "year", 0)
+
+    assert "after=" in stub.requests[-1]
+    assert _averages(history) == [1, 2, 3, 4]
+
+
+def test_full_pull_gets_backfilled_values(history, monkeypatch):
+    with StubBackend() as stub:
+        stub.values = [_value(average, 10 - average) for average in (1, 2, 3)]
+        backend = stub.client()
+        kamas_values.pull_scope_kamas_value(backend, "boune", "year", 0)
+        stub.values += [_value(99, 7.5), _value(4, 1)]
+        kamas_values.pull_scope_kamas_value(backend, "boune", "year", 0)
+        assert _averages(history) == [1, 2, 3, 4]
+
+        monkeypatch.setattr(history_module, "HISTORY_FULL_SYNC_INTERVAL", 0)
+        kamas_values.pull_scope_kamas_value(backend, "boune", "year", 0)
+
+    assert "after=" not in stub.requests[-1]
+    assert _averages(history) == [1, 2, 99, 3, 4]
+
+
+def test_mirror_follows_changes(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    local_history = KamasHistory(path)
+    local_history.append([_value(1, 3), _value(2, 2)])
+    assert local_history.query("boune", 0).average.tolist() == [1, 2]
+
+    local_history.append([_value(3, 1) | {"kamas_dict": {"Le kamas": 3}}])
+    columns = local_history.query("boune", 0)
+    assert columns.sites == ["D2gate", "Le kamas"]
+    assert columns.prices[1].tolist()[-1] == 3
+
+    KamasHistory(path).append([_value(4, 0.5)])
+    assert local_history.query("boune", 0).average.tolist() == [1, 2, 3, 4]
+    start = to_time(_timestamp(1.5))
+    assert local_history.query("boune", start).average.tolist() == [3, 4]
@@ -0,0 +1,130 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Incremental tokenizers test module."""
+
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.models.scraping_model import ScrapingRequest
+from src.utils.enums import ServerTouch
+from src.utils.scraping import websites
+
+PAGES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "pages")
+
+
+def _page(name: str) -> bytes:
+    with open(os.path.join(PAGES, name), "rb") as file:
+        return file.read()
+
+
+def _tokenize(page: bytes, tokenizer, chunk_size: int) -> str:
+    for start in range(0, len(page), chunk_size):
+        if tokenizer.feed_chunk(page[start : start + chunk_size], "utf-8"):
+            break
+    assert tokenizer.done
+    return tokenizer.body()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096])
+@pytest.mark.parametrize(
+    "name, request_builder, parse",
+    [
+        (
+            "kamas_facile.html",
+            websites.kamas_facile_request,
+            websites.parse_kamas_facile,
+        ),
+        (
+            "try_and_judge.html",
+            websites.try_and_judge_request,
+            websites.parse_try_and_judge,
+        ),
+    ],
+)
+def test_element_tokenizer(name, request_builder, parse, chunk_size):
+    page = _page(name)
+    request = request_builder("boune")
+
+    body = _tokenize(page, request.tokenizer(), chunk_size)
+
+    assert len(body.encode()) < len(page)
+    assert parse(body, request) == parse(page.decode(), request)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 4096])
+def test_listing_tokenizer(chunk_size):
+    page = _page("i_game_gold.html")
+    requests = [websites.i_game_gold_request(server.value) for server in ServerTouch]
+
+    body = _tokenize(page, requests[0].tokenizer(), chunk_size)
+
+    assert len(body.encode()) < len(page)
+    for request in requests:
+        assert websites.parse_i_game_gold(body, request) == websites.parse_i_game_gold(
+            page.decode(), request
+        )
+
+
+def test_small_rest_drained_for_keep_alive():
+    page = _page("kamas_facile.html")
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        """
+        Handler answering the saved page on a keep-alive connection
+        """
+
+        protocol_version = "HTTP/1.1"
+
+        def setup(self) -> None:
+            connections.append(self.client_address)
+            super().setup()
+
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    request = ScrapingRequest(
+        url=f"http://127.0.0.1:{server.server_address[1]}/boune",
+        tokenizer=websites.price_tokenizer,
+    )
+    try:
+        for _ in range(3):
+            assert websites.send(request)[0] == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(connections) == 1
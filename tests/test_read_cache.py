@@ -0,0 +1,72 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Read cache test module."""
+
+import concurrent.futures
+
+from src.controllers import servers_controller
+from src.utils.read_cache import ReadCache
+
+
+def test_peek_ignores_age():
+    cache = ReadCache(ttls={"/today": 0}, stale_time=0)
+    assert cache.peek(("/today", "dodge")) is None
+
+    cache.store(("/today", "dodge"), ["value"])
+    assert cache.peek(("/today", "dodge")) == ["value"]
+
+
+def test_listeners_get_previous_value():
+    cache = ReadCache()
+    stored = []
+    cache.listeners.append(lambda *args: stored.append(args))
+
+    cache.get(("/today", "dodge"), lambda: 1)
+    cache.get(("/today", "dodge"), lambda: 2, refresh=True)
+
+    assert stored == [(("/today", "dodge"), None, 1), (("/today", "dodge"), 1, 2)]
+
+
+def test_newer_values_warm_up_page(monkeypatch):
+    warmed = []
+    warmer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(servers_controller, "PAGE_WARMER", warmer)
+    monkeypatch.setattr(
+        servers_controller, "warm_up_server", lambda *args: warmed.append(args)
+    )
+
+    def values(timestamp):
+        return [{"timestamp": timestamp}, {"timestamp": "2026-10-17T09:00:00"}]
+
+    key = ("/today", "dodge")
+    servers_controller.warm_up_newer_values(key, None, values("2026-10-17T10:00:00"))
+    servers_controller.warm_up_newer_values(
+        key, values("2026-10-17T10:00:00"), values("2026-10-17T10:00:00")
+    )
+    servers_controller.warm_up_newer_values(
+        key, values("2026-10-17T10:00:00"), values("2026-10-17T10:30:00")
+    )
+    warmer.shutdown(wait=True)
+
+    assert warmed == [("dodge", False)]
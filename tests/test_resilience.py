@@ -0,0 +1,202 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Circuit breaker test module."""
+
+import asyncio
+
+import pytest
+import requests
+
+from src.models.scraping_model import ScrapingRequest
+from src.utils.scraping import async_websites, resilience
+from src.utils.scraping.async_websites import ScrapingEngine
+from src.utils.scraping.resilience import CircuitBreaker, WebsiteSkipped
+
+NAME = "I game gold"
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_time=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.probing
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert not breaker.probing
+
+
+def test_breaker_released_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+class Engine(ScrapingEngine):
+    """
+    Engine answering with canned results instead of the websites
+    """
+
+    def __init__(self, fail: bool):
+        super().__init__()
+        self.fail = fail
+        self.sent: list = []
+
+    async def _fetch(self, request: ScrapingRequest) -> str:
+        self.sent.append(request.url)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise requests.exceptions.RequestException("Endpoint is not available")
+        return request.url
+
+
+class StatusEngine(ScrapingEngine):
+    """
+    Engine answering every request with a canned status
+    """
+
+    def __init__(self, status: int):
+        super().__init__()
+        self.status = status
+
+    async def send(self, request: ScrapingRequest, headers: dict | None = None):
+        return self.status, {}, ""
+
+
+@pytest.fixture(name="breaker")
+def fixture_breaker():
+    resilience._guards.clear()  # pylint: disable=protected-access
+    yield resilience.get_website_guard(NAME).breaker
+    resilience._guards.clear()  # pylint: disable=protected-access
+
+
+def _fetch_all(engine: Engine, urls: list) -> list:
+    async def fetch_all() -> list:
+        return await asyncio.gather(
+            *(engine.fetch(ScrapingRequest(url), NAME) for url in urls),
+            return_exceptions=True,
+        )
+
+    return asyncio.run(fetch_all())
+
+
+def test_shared_page_failure_counted_once(breaker):
+    engine = Engine(fail=True)
+    results = _fetch_all(engine, ["https://www.igamegold.com/listing"] * 10)
+
+    assert engine.sent == ["https://www.igamegold.com/listing"]
+    assert all(
+        isinstance(result, requests.exceptions.RequestException) for result in results
+    )
+    assert breaker.failures == 1
+    assert not breaker.is_open
+
+
+def test_half_open_waits_for_probe(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.recovery_time
+
+    engine = Engine(fail=False)
+    urls = [f"https://www.igamegold.com/{page}" for page in range(3)]
+    assert _fetch_all(engine, urls) == urls
+    assert not breaker.is_open
+
+
+def test_half_open_failed_probe_skips_others(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.recovery_time
+
+    engine = Engine(fail=True)
+    urls = [f"https://www.igamegold.com/{page}" for page in range(3)]
+    results = _fetch_all(engine, urls)
+
+    assert engine.sent == urls[:1]
+    assert isinstance(results[0], requests.exceptions.RequestException)
+    assert all(isinstance(result, WebsiteSkipped) for result in results[1:])
+
+
+def test_cacheable_page_error_counted(breaker):
+    engine = StatusEngine(503)
+    request = ScrapingRequest("https://www.kamasfacile.com/fr/boune", cacheable=True)
+
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.exceptions.RequestException):
+            asyncio.run(engine.scrap(request, float, NAME))
+
+    assert breaker.is_open
+
+
+def test_probe_cancelled_while_rate_limited(breaker, monkeypatch):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.recovery_time
+    bucket = resilience.get_website_guard(NAME).bucket
+    monkeypatch.setattr(bucket, "reserve", lambda: 60.0)
+
+    async def cancel_probe() -> None:
+        fetch = asyncio.create_task(
+            Engine(fail=False).fetch(ScrapingRequest("https://www.igamegold.com"), NAME)
+        )
+        await asyncio.sleep(0.01)
+        fetch.cancel()
+        await asyncio.gather(fetch, return_exceptions=True)
+
+    asyncio.run(cancel_probe())
+    assert not breaker.probing
+    assert breaker.allow()
+
+
+def test_sweep_deadline_keeps_finished_values(monkeypatch):
+    async def get_kamas_value(name, server, engine):
+        if name == NAME:
+            await asyncio.sleep(60)
+        return 1.0
+
+    monkeypatch.setattr(async_websites, "async_get_kamas_value", get_kamas_value)
+    kamas_values = async_websites.get_kamas_values(["dodge"], deadline=0.1)
+
+    expected = {name: 1.0 for name in async_websites.WEBSITES_SCRAPERS if name != NAME}
+    assert kamas_values == {"dodge": expected}
@@ -0,0 +1,50 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Scraping sweeps test module."""
+
+import pytest
+
+from src.utils.scraping.scraping import get_sweeps, parse_intervals
+
+
+def test_parse_intervals():
+    assert not parse_intervals("")
+    assert parse_intervals(" boune=15, draconiros = 20 ,") == {
+        "boune": 15,
+        "draconiros": 20,
+    }
+
+
+@pytest.mark.parametrize("value", ["atlantide=15", "boune", "boune=0", "boune=a"])
+def test_parse_intervals_invalid(value: str):
+    with pytest.raises(ValueError):
+        parse_intervals(value)
+
+
+def test_sweeps_overridden_intervals():
+    sweeps = get_sweeps(parse_intervals("boune=15,draconiros=15"))
+
+    assert sweeps[15] == ["boune", "draconiros"]
+    assert "boune" not in sweeps[29]
+    assert "draconiros" not in sweeps[31]
@@ -0,0 +1,106 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Spool test module."""
+
+import json
+import os
+
+import pytest
+import requests
+
+from src.utils.backend import Backend, PartialPostError, kamas_body
+from src.utils.spool import Spool
+from tests.backend_stub import StubBackend
+
+BODIES = [
+    kamas_body({"D2gate": 1.0}, 1.0, 1.0, 1.0, "boune", "2024-01-01T00:00:00+00:00"),
+    kamas_body({"D2gate": 2.0}, 2.0, 2.0, 2.0, "dodge", "2024-01-01T00:00:00+00:00"),
+    kamas_body({"D2gate": 3.0}, 3.0, 3.0, 3.0, "boune", "2024-01-01T00:30:00+00:00"),
+]
+
+
+@pytest.mark.parametrize("bulk_supported", [True, False])
+def test_replay(tmp_path, bulk_supported):
+    spool = Spool(str(tmp_path / "spool.jsonl"))
+    spool.append(BODIES)
+    with StubBackend(bulk_supported=bulk_supported) as stub:
+        posted = spool.replay(stub.client(), batch_size=2)
+
+    assert posted == 3
+    assert stub.posts == BODIES
+    assert len(spool) == 0
+
+
+def test_replay_partial_fallback(tmp_path):
+    spool = Spool(str(tmp_path / "spool.jsonl"))
+    spool.append(BODIES)
+    with StubBackend(bulk_supported=False) as stub:
+        stub.failing_servers = ["dodge"]
+        with pytest.raises(PartialPostError):
+            spool.replay(stub.client())
+
+    assert stub.posts == BODIES[:1]
+    assert len(spool) == 2
+
+
+def test_replay_rejected(tmp_path):
+    spool = Spool(str(tmp_path / "spool.jsonl"))
+    spool.append(BODIES)
+
+    with StubBackend() as stub:
+        stub.rejected_servers = ["dodge"]
+        assert spool.replay(stub.client(), batch_size=1) == 2
+
+    assert stub.posts == [BODIES[0], BODIES[2]]
+    assert len(spool) == 0
+    with open(spool.quarantine_path, "r", encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == BODIES[1:2]
+
+
+def test_replay_backend_not_available(tmp_path):
+    spool = Spool(str(tmp_path / "spool.jsonl"))
+    spool.append(BODIES)
+    backend = Backend()
+    backend.host, backend.port = "127.0.0.1", "1"
+
+    with pytest.raises(requests.exceptions.RequestException):
+        spool.replay(backend)
+    assert len(spool) == 3
+
+
+def test_append_deduplicates(tmp_path):
+    spool = Spool(str(tmp_path / "spool.jsonl"))
+    spool.append(BODIES[:2])
+    spool.append(BODIES)
+
+    assert len(spool) == 3
+
+
+def test_append_drops_oldest_above_max_bytes(tmp_path):
+    path = str(tmp_path / "spool.jsonl")
+    Spool(path).append(BODIES[:1])
+    spool = Spool(path, max_bytes=os.path.getsize(path) * 2)
+    spool.append(BODIES[1:])
+
+    assert [body["average"] for body in Spool(path)._read()] == [2.0, 3.0]
@@ -0,0 +1,65 @@
+# MIT License
+#
+# Copyright (c) 2023 Clément RAOUL
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Tools test module."""
+
+import numpy as np
+
+from src.utils.tools import parse_timestamps
+
+
+def test_parse_timestamps_offsets():
+    dates = parse_timestamps(
+        [
+            "2024-01-01T12:00:00.123456+02:00",
+            "2024-01-01T12:00:00-05:30",
+            "2024-01-01T10:00:00Z",
+            "2024-01-01T10:00:00.5",
+        ]
+    )
+
+    np.testing.assert_array_equal(
+        dates,
+        np.array(
+            [
+                "2024-01-01T10:00:00.123456",
+                "2024-01-01T17:30:00",
+                "2024-01-01T10:00:00",
+                "2024-01-01T10:00:00.500000",
+            ],
+            dtype="datetime64[us]",
+        ),
+    )
+
+
+def test_parse_timestamps_fraction_digits():
+    dates = parse_timestamps(
+        ["2024-01-01T00:00:00.1+00:00", "2024-01-01T00:00:00.123+00:00"]
+    )
+
+    assert dates.dtype == np.dtype("datetime64[us]")
+    assert np.diff(dates.astype(np.int64)).tolist() == [23000]
+
+
+def test_parse_timestamps_empty():
+    assert len(parse_timestamps([])) == 0